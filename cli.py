@@ -6,10 +6,17 @@
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import importlib
+import os
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from types import ModuleType
+from typing import Iterator, Optional, Sequence
 
 # 專案根目錄
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -23,11 +30,89 @@ RESEARCH2 = PROJECT_ROOT / "research2"
 RESEARCH3 = PROJECT_ROOT / "research3"
 
 
+def _load_script(script: Path) -> ModuleType:
+    """以模組形式匯入腳本（其所在目錄加入 sys.path 以解析同層 import）"""
+    directory = str(script.parent)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(script.stem)
+
+
+def _is_project_module(module: Optional[ModuleType]) -> bool:
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return False
+    parent = Path(path).resolve().parent
+    return parent in (RESEARCH1, RESEARCH2, RESEARCH3)
+
+
+@contextmanager
+def _isolated_run() -> Iterator[None]:
+    """隔離同一直譯器內的各次執行
+
+    結束後關閉所有圖形、還原 rcParams 與 matplotlib 後端，並卸載專案內的模組，
+    下一次執行會重新匯入（模組層級的樣式設定、快取與全域變數都重新開始）；
+    numpy、matplotlib 等第三方套件仍保留在記憶體中。
+    """
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
+
+    backend = mpl.get_backend()
+    try:
+        with mpl.rc_context():  # rc_context 不還原後端，另外處理
+            yield
+    finally:
+        plt.close("all")
+        if mpl.get_backend() != backend:
+            plt.switch_backend(backend)
+        for name, module in list(sys.modules.items()):
+            if _is_project_module(module):
+                del sys.modules[name]
+
+
+def _run_in_process(script: Path, args: Sequence[str], cwd: Optional[Path] = None) -> None:
+    """在目前的直譯器內呼叫腳本的 main()，省去每次啟動子程序的成本"""
+    previous_argv = sys.argv
+    previous_cwd = Path.cwd()
+    sys.argv = [str(script), *args]
+    if cwd is not None:
+        os.chdir(cwd)
+    try:
+        with _isolated_run():
+            _load_script(script).main()
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            raise RuntimeError(str(exc.code)) from exc
+    except Exception as exc:
+        raise RuntimeError(f"{type(exc).__name__}: {exc}") from exc
+    finally:
+        sys.argv = previous_argv
+        if cwd is not None:
+            os.chdir(previous_cwd)
+
+
+def _preimport() -> None:
+    """工作程序初始化：預先載入重量級套件，之後的任務不必重複匯入"""
+    for name in ("numpy", "pandas", "scipy", "matplotlib", "matplotlib.pyplot", "meshio"):
+        try:
+            importlib.import_module(name)
+        except ImportError:  # pragma: no cover - optional in some environments
+            pass
+
+
 class PlasmaCLI:
     """電漿模擬統一 CLI 主程式"""
 
-    def __init__(self) -> None:
+    def __init__(self, use_subprocess: bool = False) -> None:
         self.running = True
+        self.use_subprocess = use_subprocess
+        self._pool: ProcessPoolExecutor | None = None
+
+    def close(self) -> None:
+        """關閉常駐工作程序池"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
 
     # ------------------------------------------------------------------ 主選單
     def main_menu(self) -> None:
@@ -72,8 +157,9 @@ class PlasmaCLI:
             return
 
         try:
-            subprocess.run([str(PYTHON_BIN), str(chart_cli)], check=True)
-        except subprocess.CalledProcessError as e:
+            args = ["--isolated"] if self.use_subprocess else []
+            self._execute(chart_cli, args, interactive=True)
+        except (subprocess.CalledProcessError, RuntimeError) as e:
             print(f"⚠️  執行失敗：{e}")
         except KeyboardInterrupt:
             print("\n已中斷，返回主選單。")
@@ -90,6 +176,7 @@ class PlasmaCLI:
             print("  1) 徑向切片分析 (Radial Slice)")
             print("  2) 軸向切片分析 (Axial Slice)")
             print("  3) 衰減半徑分析 (Decay Radius)")
+            print("  4) 同時執行全部分析（預設參數）")
             print("  b) 返回主選單")
 
             choice = input("輸入選項: ").strip().lower()
@@ -100,6 +187,8 @@ class PlasmaCLI:
                 self.run_axial_slice()
             elif choice == "3":
                 self.run_decay_radius()
+            elif choice == "4":
+                self.run_all_research2()
             elif choice == "b":
                 break
             else:
@@ -112,15 +201,15 @@ class PlasmaCLI:
         show = input("顯示圖形？(y/n，預設 y): ").strip().lower() or "y"
         output = input("輸出路徑 (Enter 使用預設 plots/radial_slice_*.png): ").strip()
 
-        cmd = [str(PYTHON_BIN), str(RESEARCH2 / "plot_radial_slice.py")]
+        args: list[str] = []
         if z_input:
-            cmd.extend(["--z", z_input])
+            args.extend(["--z", z_input])
         if show == "y":
-            cmd.append("--show")
+            args.append("--show")
         if output:
-            cmd.extend(["--output", output])
+            args.extend(["--output", output])
 
-        self._run_command(cmd)
+        self._run_script(RESEARCH2 / "plot_radial_slice.py", args)
 
     def run_axial_slice(self) -> None:
         """執行軸向切片分析"""
@@ -130,20 +219,13 @@ class PlasmaCLI:
         show = input("顯示圖形？(y/n，預設 y): ").strip().lower() or "y"
         output = input("輸出路徑 (Enter 使用預設 plots/axis_slice_*.png): ").strip()
 
-        cmd = [
-            str(PYTHON_BIN),
-            str(RESEARCH2 / "plot_axis_slice.py"),
-            "--radius",
-            radius,
-            "--samples",
-            samples,
-        ]
+        args = ["--radius", radius, "--samples", samples]
         if show == "y":
-            cmd.append("--show")
+            args.append("--show")
         if output:
-            cmd.extend(["--output", output])
+            args.extend(["--output", output])
 
-        self._run_command(cmd)
+        self._run_script(RESEARCH2 / "plot_axis_slice.py", args)
 
     def run_decay_radius(self) -> None:
         """執行衰減半徑分析"""
@@ -152,16 +234,42 @@ class PlasmaCLI:
         show = input("顯示圖形？(y/n，預設 y): ").strip().lower() or "y"
         output = input("輸出路徑 (Enter 使用預設 plots/decay_radius_*.png): ").strip()
 
-        cmd = [str(PYTHON_BIN), str(RESEARCH2 / "plot_decay_radius.py")]
+        args: list[str] = []
         if alpha_input:
-            cmd.append("--alpha")
-            cmd.extend(alpha_input.split())
+            args.append("--alpha")
+            args.extend(alpha_input.split())
         if show == "y":
-            cmd.append("--show")
+            args.append("--show")
         if output:
-            cmd.extend(["--output", output])
+            args.extend(["--output", output])
+
+        self._run_script(RESEARCH2 / "plot_decay_radius.py", args)
 
-        self._run_command(cmd)
+    def run_all_research2(self) -> None:
+        """以預設參數並行執行三項 Research 2 分析"""
+        scripts = ["plot_radial_slice.py", "plot_axis_slice.py", "plot_decay_radius.py"]
+        # 各腳本預設以全部 CPU 解析 VTU；同時執行時平分，避免工作程序數變成三倍
+        jobs = str(max(1, (os.cpu_count() or 1) // len(scripts)))
+        cmds = [[str(PYTHON_BIN), str(RESEARCH2 / name), "--jobs", jobs] for name in scripts]
+
+        print("\n" + "-" * 60)
+        print("並行執行指令：")
+        for cmd in cmds:
+            print(" ".join(cmd))
+        print("-" * 60)
+
+        try:
+            codes = asyncio.run(self._run_many(cmds))
+        except KeyboardInterrupt:
+            print("\n已中斷")
+        else:
+            failed = [name for name, code in zip(scripts, codes) if code != 0]
+            if failed:
+                print(f"\n⚠️  執行失敗：{', '.join(failed)}")
+            else:
+                print("\n✅ 全部執行完成")
+
+        input("\n按 Enter 繼續...")
 
     # ------------------------------------------------------------------ Research 3
     def launch_research3(self) -> None:
@@ -187,27 +295,76 @@ class PlasmaCLI:
             return
 
         # 切換到 research3 目錄執行（因為路徑寫死在程式中）
-        cmd = [str(PYTHON_BIN), str(script)]
         try:
-            subprocess.run(cmd, cwd=str(RESEARCH3), check=True)
+            self._execute(script, [], cwd=RESEARCH3)
             print("\n✅ 圖表已生成於 research3/ 目錄")
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, RuntimeError) as e:
             print(f"⚠️  執行失敗：{e}")
 
         input("\n按 Enter 返回主選單...")
 
     # ------------------------------------------------------------------ 工具函數
-    def _run_command(self, cmd: list[str]) -> None:
-        """執行指令並處理錯誤"""
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=2, initializer=_preimport)
+        return self._pool
+
+    def _execute(
+        self,
+        script: Path,
+        args: Sequence[str],
+        cwd: Optional[Path] = None,
+        *,
+        interactive: bool = False,
+    ) -> None:
+        """依模式執行腳本；失敗時拋出例外
+
+        預設在同一直譯器中執行。隔離模式下，非互動腳本交給常駐的工作程序池
+        （已預先匯入套件）；需要標準輸入的互動腳本與會開啟視窗（--show）的腳本
+        仍以獨立子程序執行，GUI 後端不必在 fork 出的工作程序中啟動。
+        """
+        if not self.use_subprocess:
+            _run_in_process(script, args, cwd=cwd)
+        elif interactive or "--show" in args:
+            cmd = [str(PYTHON_BIN), str(script), *args]
+            subprocess.run(cmd, cwd=str(cwd) if cwd is not None else None, check=True)
+        else:
+            try:
+                self._get_pool().submit(_run_in_process, script, list(args), cwd).result()
+            except KeyboardInterrupt:
+                self.close()  # 中斷後工作程序狀態不明，下次重新建立
+                raise
+
+    async def _run_many(self, cmds: Sequence[Sequence[str]]) -> list[int]:
+        """同時啟動多個子程序；全部結束後依序輸出各自的結果並回傳結束碼"""
+        procs = [
+            await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            for cmd in cmds
+        ]
+        outputs = await asyncio.gather(*(proc.communicate() for proc in procs))
+        for cmd, (stdout, stderr) in zip(cmds, outputs):
+            print(f"\n>>> {Path(cmd[1]).name}")
+            if stdout:
+                print(stdout.decode(errors="replace").rstrip())
+            if stderr:
+                print(stderr.decode(errors="replace").rstrip(), file=sys.stderr)
+        return [proc.returncode for proc in procs]
+
+    def _run_script(self, script: Path, args: Sequence[str]) -> None:
+        """執行腳本並處理錯誤"""
         print("\n" + "-" * 60)
         print("執行指令：")
-        print(" ".join(cmd))
+        print(" ".join([str(PYTHON_BIN), str(script), *args]))
         print("-" * 60)
 
         try:
-            subprocess.run(cmd, check=True)
+            self._execute(script, args)
             print("\n✅ 執行完成")
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, RuntimeError) as e:
             print(f"\n⚠️  執行失敗：{e}")
         except KeyboardInterrupt:
             print("\n已中斷")
@@ -215,13 +372,26 @@ class PlasmaCLI:
         input("\n按 Enter 繼續...")
 
 
-def main() -> None:
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="電漿模擬數據分析統一 CLI")
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="以獨立程序執行各分析腳本（常駐工作程序池；預設在同一直譯器中執行）",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
     """主程式入口"""
-    cli = PlasmaCLI()
+    args = parse_args(argv)
+    cli = PlasmaCLI(use_subprocess=args.subprocess)
     try:
         cli.main_menu()
     except KeyboardInterrupt:
         print("\n\n再見！")
+    finally:
+        cli.close()
 
 
 if __name__ == "__main__":
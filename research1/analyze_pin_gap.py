@@ -4,13 +4,17 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 from typing import Sequence
 
-import pandas as pd
+import numpy as np
 
+from table_io import read_table
 
-def parse_args() -> argparse.Namespace:
+
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="List covered Pin values and highlight gaps.")
     parser.add_argument(
         "--stats",
@@ -29,19 +33,23 @@ def parse_args() -> argparse.Namespace:
         default=500.0,
         help="Report gaps larger than this value (default: 500)",
     )
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
 
 def format_pin_list(pins: Sequence[float]) -> str:
     return ", ".join(f"{pin:g}" for pin in pins)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
     if not args.stats.exists():
         raise SystemExit(f"stats file not found: {args.stats}")
 
-    df = pd.read_csv(args.stats)
+    df = read_table(args.stats, columns=["dataset", "pin"])
     required = {"dataset", "pin"}
     missing = required.difference(df.columns)
     if missing:
@@ -55,26 +63,23 @@ def main() -> None:
         )
 
     df = df[df["dataset"] == args.dataset]
-    pins = sorted(set(df["pin"].astype(float)))
-    if not pins:
+    pins = np.unique(df["pin"].to_numpy(dtype=np.float64))
+    if pins.size == 0:
         print(f"Dataset '{args.dataset}' contains no Pin entries")
         return
 
     print(f"Dataset: {args.dataset}")
-    print(f"總計覆蓋 Pin 數: {len(pins)}")
+    print(f"總計覆蓋 Pin 數: {pins.size}")
     print("Pin 值 (排序後):")
     print(format_pin_list(pins))
 
-    gaps = []
-    for prev, curr in zip(pins, pins[1:]):
-        diff = curr - prev
-        if diff > args.max_gap:
-            gaps.append((prev, curr, diff))
+    diffs = np.diff(pins)
+    gap_idx = np.flatnonzero(diffs > args.max_gap)
 
-    if gaps:
+    if gap_idx.size:
         print(f"\n缺口 (間距 > {args.max_gap:g} W):")
-        for prev, curr, diff in gaps:
-            print(f"  {prev:g} → {curr:g}  (差 {diff:g} W)")
+        for idx in gap_idx:
+            print(f"  {pins[idx]:g} → {pins[idx + 1]:g}  (差 {diffs[idx]:g} W)")
     else:
         print(f"\n未發現間距大於 {args.max_gap:g} W 的 Pin 缺口。")
 
@@ -4,17 +4,29 @@
 from __future__ import annotations
 
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy.stats import gaussian_kde
 
+from disk_cache import file_signature
 from generate_pin_table import convert_vtu_to_tables
+from kde import kernel_sums_binned, kernel_sums_direct, scott_bandwidth
+from table_io import BackgroundTableWriter, write_table
 
+KDE_GRID_POINTS = 512
+# Groups at least this large use the binned FFT estimator instead of exact sums. Its
+# mode can land one grid step (1/511 of the group's log10 range) from the exact one.
+_KDE_FFT_MIN_SAMPLES = 2 * KDE_GRID_POINTS
 
-def parse_args() -> argparse.Namespace:
+
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Consolidate multiple VTU datasets into CSV tables."
     )
@@ -30,76 +42,237 @@ def parse_args() -> argparse.Namespace:
         default=Path("data"),
         help="Directory where consolidated CSV files will be written",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to parse VTU cases (default: CPU count)",
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write zstd Parquet copies of the tables (needs pyarrow); readers prefer them",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every VTU file instead of reusing density fields cached in <output-dir>/.cache",
+    )
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
+
+
+def read_pin_values(pin_file: Path) -> Tuple[float, ...]:
+    """Parse a .pins file; memoized per file revision, so an edited file is re-read."""
+    return _parse_pin_file(*file_signature(pin_file))
 
 
-def read_pin_values(pin_file: Path) -> List[float]:
+@lru_cache(maxsize=None)
+def _parse_pin_file(resolved: str, mtime_ns: int, size: int) -> Tuple[float, ...]:
+    pin_file = Path(resolved)
     text = pin_file.read_text(encoding="utf-8")
-    tokens = [token for token in text.replace(",", " ").split() if token]
+    tokens = text.replace(",", " ").split()
     if not tokens:
         raise ValueError(f"No Pin values found in {pin_file}")
     try:
-        return [float(token) for token in tokens]
+        # NumPy converts the whole token list in C instead of a float() per token.
+        return tuple(np.asarray(tokens, dtype=np.float64).tolist())
     except ValueError as exc:
         raise ValueError(f"Failed to parse Pin values in {pin_file}: {exc}") from exc
 
 
-def determine_dataset_name(datasets_dir: Path, vtu_path: Path) -> str:
-    """Use the top-level folder name as dataset; fallback to file stem."""
-    rel = vtu_path.relative_to(datasets_dir)
-    if len(rel.parts) == 1:
-        return rel.stem
-    return rel.parts[0]
+@lru_cache(maxsize=None)
+def _dataset_for_dir(datasets_dir: Path, parent: Path) -> str:
+    return parent.relative_to(datasets_dir).parts[0]
 
 
-def process_case(dataset_name: str, vtu_path: Path, pins: Iterable[float]) -> pd.DataFrame:
-    values_df, _ = convert_vtu_to_tables(vtu_path, pins)
-    values_df.insert(0, "dataset", dataset_name)
+def determine_dataset_name(datasets_dir: Path, vtu_path: Path) -> str:
+    """Use the top-level folder name as dataset; fallback to file stem."""
+    parent = vtu_path.parent
+    if parent == datasets_dir:
+        return vtu_path.stem
+    # Memoized per directory: every VTU in a folder maps to the same dataset.
+    return _dataset_for_dir(datasets_dir, parent)
+
+
+def process_case(
+    vtu_path: Path,
+    pins: Iterable[float],
+    cache_dir: Optional[Path] = None,
+) -> pd.DataFrame:
+    """Build the per-point table for one case; ``cache_dir`` keeps its parsed density fields.
+
+    The ``dataset`` column is added by the caller right before the rows are written.
+    """
+    values_df, _ = convert_vtu_to_tables(vtu_path, list(pins), cache_dir)
     return values_df
 
 
-def summarise_by_pin(df: pd.DataFrame) -> pd.DataFrame:
-    grouped = df.groupby("pin")["value"]
-
-    summary = grouped.agg(
-        std=lambda s: float(np.std(s, ddof=0)),
-        min=lambda s: float(np.min(s)),
-        q1=lambda s: float(np.quantile(s, 0.25)),
-        median=lambda s: float(np.median(s)),
-        q3=lambda s: float(np.quantile(s, 0.75)),
-        max=lambda s: float(np.max(s)),
-        valid_points=lambda s: int(s.size),
-    ).reset_index().sort_values("pin")
-
-    modes = []
-    for pin, series in grouped:
-        values = series.to_numpy(dtype=float)
-        values = values[np.isfinite(values) & (values > 0)]
-        if values.size >= 2:
-            log_vals = np.log10(values)
-            try:
-                kde = gaussian_kde(log_vals)
-                grid = np.linspace(log_vals.min(), log_vals.max(), 512)
-                mode_log = grid[np.argmax(kde(grid))]
-                mode_val = float(10 ** mode_log)
-            except Exception:
-                mode_val = float(np.median(values))
-        elif values.size == 1:
-            mode_val = float(values[0])
-        else:
-            mode_val = float("nan")
-        modes.append((float(pin), mode_val))
-
-    modes_df = pd.DataFrame(modes, columns=["pin", "mode"])
-    return summary.merge(modes_df, on="pin", how="left")
+def _kde_modes(pin_codes: np.ndarray, values: np.ndarray, n_pins: int) -> np.ndarray:
+    """Return the KDE peak of ``log10(values)`` for every Pin group.
+
+    ``pin_codes`` assigns each positive, finite value to a group in ``range(n_pins)``.
+    The Gaussian kernel uses Scott's bandwidth, matching ``scipy.stats.gaussian_kde``.
+    Small groups are evaluated together with exact broadcast sums; each large group
+    (``_KDE_FFT_MIN_SAMPLES`` or more) goes through its own binned FFT convolution.
+    """
+    modes = np.full(n_pins, np.nan)
+    counts = np.bincount(pin_codes, minlength=n_pins)
+    if values.size == 0:
+        return modes
+
+    # One contiguous run of log-samples per Pin, in code order.
+    order = np.argsort(pin_codes, kind="stable")
+    log_values = np.log10(values[order])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    single = counts == 1
+    modes[single] = 10 ** log_values[starts[single]]
+
+    # Only the small groups are NaN-padded into one batch; its width stays below
+    # _KDE_FFT_MIN_SAMPLES however large the biggest group is.
+    small = np.flatnonzero((counts >= 2) & (counts < _KDE_FFT_MIN_SAMPLES))
+    if small.size:
+        sizes = counts[small]
+        rows = np.repeat(np.arange(small.size), sizes)
+        cols = np.arange(rows.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        padded = np.full((small.size, int(sizes.max())), np.nan)
+        padded[rows, cols] = log_values[starts[small][rows] + cols]
+
+        lo = np.nanmin(padded, axis=1)
+        hi = np.nanmax(padded, axis=1)
+        bandwidth = np.nanstd(padded, axis=1, ddof=1) * sizes ** -0.2
+        # Identical samples make the KDE singular; their common value is the mode.
+        mode_log = lo.copy()
+        spread = np.flatnonzero(bandwidth > 0)
+        if spread.size:
+            grids = np.linspace(lo[spread], hi[spread], KDE_GRID_POINTS, axis=1)
+            density = kernel_sums_direct(padded[spread], grids, bandwidth[spread])
+            mode_log[spread] = grids[np.arange(spread.size), np.argmax(density, axis=1)]
+        modes[small] = 10 ** mode_log
+
+    for code in np.flatnonzero(counts >= _KDE_FFT_MIN_SAMPLES):
+        samples = log_values[starts[code] : starts[code] + counts[code]]
+        lo, hi = samples.min(), samples.max()
+        bandwidth = scott_bandwidth(samples)
+        if not bandwidth > 0:
+            modes[code] = 10 ** lo
+            continue
+        grid = np.linspace(lo, hi, KDE_GRID_POINTS)
+        density = kernel_sums_binned(
+            samples[None, :], np.array([lo]), np.array([hi]), np.array([bandwidth]), KDE_GRID_POINTS
+        )[0]
+        modes[code] = 10 ** grid[np.argmax(density)]
+    return modes
+
+
+def summarise_by_pin(df: pd.DataFrame, count_distinct: Optional[str] = None) -> pd.DataFrame:
+    """Per-Pin statistics of ``value``.
+
+    When ``count_distinct`` names a column, its number of distinct values per Pin is
+    added as ``<column>_count`` from the same groupby, so the Pin keys are only
+    factorised once.
+    """
+    pin_groups = df.groupby("pin")
+    grouped = pin_groups["value"]
+
+    # Built-in reducers stay on pandas' Cython paths; quantiles come from one pass.
+    quartiles = grouped.quantile([0.25, 0.75]).unstack(level=-1)
+    columns = {
+        "std": grouped.std(ddof=0),
+        "min": grouped.min(),
+        "q1": quartiles[0.25],
+        "median": grouped.median(),
+        "q3": quartiles[0.75],
+        "max": grouped.max(),
+        "valid_points": grouped.size(),
+    }
+    if count_distinct is not None:
+        columns[f"{count_distinct}_count"] = pin_groups[count_distinct].nunique()
+    summary = pd.concat(columns, axis=1).reset_index().sort_values("pin")
+
+    # Reuse the groupby's factorisation: ngroup() numbers rows in sorted-Pin order.
+    pin_codes = grouped.ngroup().to_numpy()
+    values = df["value"].to_numpy(dtype=np.float64, copy=False)
+    positive = (pin_codes >= 0) & np.isfinite(values) & (values > 0)
+    summary["mode"] = _kde_modes(pin_codes[positive], values[positive], len(summary))
+    return summary
 
 
 def collect_vtu_files(datasets_dir: Path) -> List[Path]:
-    return sorted(p for p in datasets_dir.rglob("*.vtu") if p.is_file())
+    """Recursively list .vtu files, reusing the directory entry types from scandir."""
+    found: List[Path] = []
+    stack = [datasets_dir]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except PermissionError:
+            continue
+        with entries:
+            for entry in entries:
+                # Like rglob, do not descend into symlinked directories.
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.name.endswith(".vtu") and entry.is_file():
+                    found.append(Path(entry.path))
+    found.sort()
+    return found
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    dataset_name: str
+    values_df: Optional[pd.DataFrame] = None
+    stats_df: Optional[pd.DataFrame] = None
+    message: Optional[str] = None
+
+
+def _process_one(task: Tuple[Path, Path, Optional[Path]]) -> CaseResult:
+    """Worker entry point: parse one VTU case and summarise it per Pin."""
+    datasets_dir, vtu_path, cache_dir = task
+    dataset_name = determine_dataset_name(datasets_dir, vtu_path)
+    pins_path = vtu_path.with_suffix(".pins")
+    if not pins_path.exists():
+        return CaseResult(dataset_name, message=f"Skipping {dataset_name}: missing Pin list {pins_path}")
+
+    try:
+        pin_values = read_pin_values(pins_path)
+    except ValueError as exc:
+        return CaseResult(dataset_name, message=f"Skipping {dataset_name}: {exc}")
+
+    try:
+        values_df = process_case(vtu_path, pin_values, cache_dir)
+    except Exception as exc:  # pragma: no cover
+        return CaseResult(dataset_name, message=f"Failed to process {dataset_name}: {exc}")
+
+    stats_df = summarise_by_pin(values_df)
+    stats_df.insert(0, "dataset", dataset_name)
+    stats_df["dataset_count"] = 1
+    return CaseResult(dataset_name, values_df, stats_df)
+
+
+def process_cases(
+    datasets_dir: Path,
+    vtu_files: List[Path],
+    jobs: int,
+    cache_dir: Optional[Path] = None,
+) -> Iterator[CaseResult]:
+    """Process VTU cases in parallel, yielding results in input order as they finish."""
+    tasks = [(datasets_dir, vtu_path, cache_dir) for vtu_path in vtu_files]
+    workers = max(1, min(jobs, len(tasks)))
+    if workers == 1:
+        yield from map(_process_one, tasks)
+        return
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_process_one, tasks, chunksize=chunksize)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
 
     datasets_dir = args.datasets_dir.resolve()
     output_dir = args.output_dir.resolve()
@@ -110,55 +283,54 @@ def main() -> None:
         print(f"No VTU files found in {datasets_dir}")
         return
 
-    all_values: List[pd.DataFrame] = []
+    values_output = output_dir / "all_values.csv"
+    stats_output = output_dir / "all_stats.csv"
+    index_output = output_dir / "dataset_index.txt"
+
+    # Only the Pin/value columns needed for the aggregate summary are kept in memory;
+    # full per-point rows are streamed to disk one case at a time.
+    pin_arrays: List[np.ndarray] = []
+    value_arrays: List[np.ndarray] = []
+    row_counts: List[int] = []
     per_dataset_stats: List[pd.DataFrame] = []
     processed_names: List[str] = []
 
-    for vtu_path in vtu_files:
-        dataset_name = determine_dataset_name(datasets_dir, vtu_path)
-        pins_path = vtu_path.with_suffix(".pins")
-        if not pins_path.exists():
-            print(f"Skipping {dataset_name}: missing Pin list {pins_path}")
-            continue
-
-        try:
-            pin_values = read_pin_values(pins_path)
-        except ValueError as exc:
-            print(f"Skipping {dataset_name}: {exc}")
-            continue
-
-        try:
-            values_df = process_case(dataset_name, vtu_path, pin_values)
-        except Exception as exc:  # pragma: no cover
-            print(f"Failed to process {dataset_name}: {exc}")
-            continue
-
-        all_values.append(values_df)
-        processed_names.append(dataset_name)
-
-        stats_df = summarise_by_pin(values_df)
-        stats_df.insert(0, "dataset", dataset_name)
-        stats_df["dataset_count"] = 1
-        per_dataset_stats.append(stats_df)
+    cache_dir = None if args.no_cache else output_dir / ".cache"
+    # Per-case rows are written on a background thread while the next case is received.
+    with BackgroundTableWriter(values_output, parquet=args.parquet) as values_writer:
+        for result in process_cases(datasets_dir, vtu_files, args.jobs, cache_dir):
+            if result.message is not None:
+                print(result.message)
+                continue
+
+            values_df = result.values_df
+            # Copies, so the case's full float block can be freed after writing.
+            pin_arrays.append(values_df["pin"].to_numpy(dtype=np.float64, copy=True))
+            value_arrays.append(values_df["value"].to_numpy(dtype=np.float64, copy=True))
+            row_counts.append(len(values_df))
+            values_df.insert(0, "dataset", result.dataset_name)
+            values_writer.write(values_df)
+            processed_names.append(result.dataset_name)
+            per_dataset_stats.append(result.stats_df)
 
     if not processed_names:
         print("No datasets were processed successfully")
         return
 
-    all_values_df = pd.concat(all_values, ignore_index=True)
-
-    values_output = output_dir / "all_values.csv"
-    stats_output = output_dir / "all_stats.csv"
-    index_output = output_dir / "dataset_index.txt"
-
-    all_values_df.to_csv(values_output, index=False)
+    # Dataset labels as a categorical: one small code per row instead of a string.
+    dataset_names, dataset_codes = np.unique(processed_names, return_inverse=True)
+    all_values_df = pd.DataFrame(
+        {
+            "dataset": pd.Categorical.from_codes(
+                np.repeat(dataset_codes, row_counts), categories=dataset_names
+            ),
+            "pin": np.concatenate(pin_arrays),
+            "value": np.concatenate(value_arrays),
+        }
+    )
 
-    aggregate_stats = summarise_by_pin(all_values_df)
+    aggregate_stats = summarise_by_pin(all_values_df, count_distinct="dataset")
     aggregate_stats.insert(0, "dataset", "ALL")
-    source_counts = (
-        all_values_df.groupby("pin")["dataset"].nunique().rename("dataset_count")
-    )
-    aggregate_stats = aggregate_stats.merge(source_counts, on="pin", how="left")
     per_dataset_stats.append(aggregate_stats)
 
     all_stats = pd.concat(per_dataset_stats, ignore_index=True)
@@ -180,8 +352,8 @@ def main() -> None:
             all_stats[col] = np.nan
     all_stats = all_stats[ordered_cols]
 
-    all_stats.to_csv(stats_output, index=False)
-    index_output.write_text("\n".join(sorted(set(processed_names))), encoding="utf-8")
+    write_table(all_stats, stats_output, parquet=args.parquet)
+    index_output.write_text("\n".join(dataset_names), encoding="utf-8")
 
     print(f"Aggregated values -> {values_output}")
     print(f"Aggregated statistics -> {stats_output}")
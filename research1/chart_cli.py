@@ -3,18 +3,24 @@
 
 from __future__ import annotations
 
+import argparse
+import importlib
 import re
 import subprocess
 import sys
 import textwrap
 import unicodedata
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+from disk_cache import dump_signed, file_signature, load_signed
+from table_io import pin_key, pin_keys, read_table
+
 PROJECT_ROOT = Path(__file__).resolve().parent
 DEFAULT_STATS = PROJECT_ROOT / "data/all_stats.csv"
 DEFAULT_VALUES = PROJECT_ROOT / "data/all_values.csv"
@@ -22,17 +28,29 @@ DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "plots"
 PYTHON_BIN = PROJECT_ROOT / "electron_density_env" / "bin" / "python"
 if not PYTHON_BIN.exists():
     PYTHON_BIN = Path(sys.executable)
+# Columns the summary and comparison scripts read from the stats table.
+_PLOT_STATS_COLUMNS = ["dataset", "pin", "mode", "max", "min"]
+
+
+_SLUG_SEPARATORS = re.compile(r"[^a-z0-9]+")
 
 
+@lru_cache(maxsize=256)
 def slugify(value: str) -> str:
     """Convert dataset names into filesystem-friendly slugs."""
-    normalized = unicodedata.normalize("NFKD", value)
-    ascii_value = normalized.encode("ascii", "ignore").decode("ascii")
-    lowercase = ascii_value.lower()
-    cleaned = re.sub(r"[^a-z0-9]+", "-", lowercase).strip("-")
+    if not value.isascii():
+        normalized = unicodedata.normalize("NFKD", value)
+        value = normalized.encode("ascii", "ignore").decode("ascii")
+    cleaned = _SLUG_SEPARATORS.sub("-", value.lower()).strip("-")
     return cleaned or "dataset"
 
 
+def _write_lines(lines: List[str]) -> None:
+    """Emit a whole menu with one write instead of a print per line."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
 def normalize_path(path: str) -> Path:
     if not path:
         return DEFAULT_OUTPUT_DIR
@@ -51,10 +69,17 @@ class DatasetEntry:
 
 
 class ChartCLI:
-    def __init__(self, stats_path: Path, values_path: Path) -> None:
+    def __init__(self, stats_path: Path, values_path: Path, *, isolated: bool = False) -> None:
         self.stats_path = stats_path
         self.values_path = values_path
+        self.isolated = isolated
         self._stats_df: pd.DataFrame | None = None
+        # Sorted distinct Pins of _stats_df; set and cleared together with it.
+        self._pin_values: np.ndarray | None = None
+        # Signature of the statistics file that self.datasets was built from.
+        self._datasets_signature: Tuple[str, int, int] | None = None
+        # Frames handed to in-process plots, keyed by name with the file signature read.
+        self._shared: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
         self.datasets = self._load_datasets()
         self.current_dataset = self.datasets[0].name if self.datasets else "ALL"
 
@@ -64,10 +89,38 @@ class ChartCLI:
             return self._stats_df
         if not self.stats_path.exists():
             raise FileNotFoundError(f"Statistics file not found: {self.stats_path}")
-        self._stats_df = pd.read_csv(self.stats_path)
+        # Only the dataset/Pin columns are used for listing and filtering.
+        df = read_table(self.stats_path, columns=["dataset", "pin"])
+        pins = pd.to_numeric(df["pin"], errors="coerce").to_numpy(dtype=float)
+        finite = np.isfinite(pins)
+        df["pin_key"] = pin_keys(pins)
+        self._pin_values = np.sort(pd.unique(pins[finite]))
+        self._stats_df = df
         return self._stats_df
 
+    def _stats_signature(self) -> Tuple[str, int, int] | None:
+        try:
+            return file_signature(self.stats_path)
+        except OSError:
+            return None
+
+    def _dataset_cache_path(self) -> Path:
+        return self.stats_path.parent / ".cache" / f"{self.stats_path.stem}.datasets.pkl"
+
     def _load_datasets(self) -> List[DatasetEntry]:
+        """Dataset list, reused from disk while the statistics CSV is unchanged."""
+        signature = self._datasets_signature = self._stats_signature()
+        if signature is None:
+            return [DatasetEntry("ALL", 0)]
+
+        cache_path = self._dataset_cache_path()
+        entries = load_signed(cache_path, signature)
+        if entries is None:
+            entries = self._scan_datasets()
+            dump_signed(cache_path, signature, entries)
+        return entries
+
+    def _scan_datasets(self) -> List[DatasetEntry]:
         try:
             df = self._get_stats_df()[["dataset", "pin"]].copy()
         except Exception:
@@ -79,23 +132,44 @@ class ChartCLI:
         df["dataset"] = df["dataset"].astype(str)
         df["pin_numeric"] = pd.to_numeric(df["pin"], errors="coerce")
 
-        global_valid = df["pin_numeric"].dropna()
-        all_entry = DatasetEntry(
+        def make_entry(name: str, pin_count, pin_min, pin_max) -> DatasetEntry:
+            # min/max are NaN for datasets without a numeric Pin.
+            return DatasetEntry(
+                name,
+                int(pin_count),
+                None if pd.isna(pin_min) else float(pin_min),
+                None if pd.isna(pin_max) else float(pin_max),
+            )
+
+        # Factorise the Pins once (NaN -> -1); distinct Pins per dataset then come from
+        # unique integer (dataset, Pin) pairs instead of a hash-set nunique per group.
+        pins = df["pin_numeric"].to_numpy(dtype=float)
+        pin_codes, pin_values = pd.factorize(pins)
+        n_pins = len(pin_values)
+        all_entry = make_entry(
             "ALL",
-            int(global_valid.nunique()),
-            float(global_valid.min()) if not global_valid.empty else None,
-            float(global_valid.max()) if not global_valid.empty else None,
+            n_pins,
+            pin_values.min() if n_pins else np.nan,
+            pin_values.max() if n_pins else np.nan,
         )
 
-        entries: List[DatasetEntry] = []
-        for dataset, group in df.groupby("dataset"):
-            if dataset.strip().upper() == "ALL":
-                continue
-            numeric = group["pin_numeric"].dropna()
-            pin_count = int(numeric.nunique())
-            pin_min = float(numeric.min()) if pin_count else None
-            pin_max = float(numeric.max()) if pin_count else None
-            entries.append(DatasetEntry(str(dataset), pin_count, pin_min, pin_max))
+        individual = (df["dataset"].str.strip().str.upper() != "ALL").to_numpy()
+        ds_codes, names = pd.factorize(df.loc[individual, "dataset"])
+        pin_codes = pin_codes[individual]
+        valid = pin_codes >= 0
+        stride = max(n_pins, 1)
+        pairs = np.unique(ds_codes[valid].astype(np.int64) * stride + pin_codes[valid])
+        pair_ds = pairs // stride
+        pair_pins = pin_values[pairs % stride]
+        counts = np.bincount(pair_ds, minlength=len(names))
+        mins = np.full(len(names), np.nan)
+        maxs = np.full(len(names), np.nan)
+        np.fmin.at(mins, pair_ds, pair_pins)
+        np.fmax.at(maxs, pair_ds, pair_pins)
+        entries = [
+            make_entry(str(name), count, lo, hi)
+            for name, count, lo, hi in zip(names, counts, mins, maxs)
+        ]
 
         def sort_key(entry: DatasetEntry):
             name = entry.name
@@ -111,8 +185,48 @@ class ChartCLI:
         entries.sort(key=sort_key)
         return [all_entry] + entries
 
+    def _shared_frame(self, key: str, path: Path, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame | None:
+        """Load ``path`` once for in-process plots; reload only when the file changes.
+
+        Returns None in isolated mode or when loading fails, so the plot script reads
+        the file itself and reports the problem.
+        """
+        if self.isolated:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._shared.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            frame = loader()
+        except Exception:
+            self._shared.pop(key, None)
+            return None
+        self._shared[key] = (signature, frame)
+        return frame
+
+    def _shared_stats(self) -> pd.DataFrame | None:
+        return self._shared_frame(
+            "stats", self.stats_path, lambda: read_table(self.stats_path, columns=_PLOT_STATS_COLUMNS)
+        )
+
+    def _shared_density_values(self) -> pd.DataFrame | None:
+        def load() -> pd.DataFrame:
+            module = importlib.import_module("plot_pin_density_distribution")
+            return module.load_density_values(self.values_path)
+
+        return self._shared_frame("density", self.values_path, load)
+
     def refresh_datasets(self) -> None:
+        signature = self._stats_signature()
+        if signature is not None and signature == self._datasets_signature:
+            return  # file unchanged since the last load: keep the list and frame
         self._stats_df = None
+        self._pin_values = None
         self.datasets = self._load_datasets()
         if self.datasets:
             if self.current_dataset not in {d.name for d in self.datasets}:
@@ -123,21 +237,22 @@ class ChartCLI:
     # ------------------------------------------------------------------ dataset selection
     def select_dataset(self) -> str:
         self.refresh_datasets()
+        # The list does not change while prompting, so format the ranges once per call.
+        ranges = [self._format_pin_range(entry) for entry in self.datasets]
+        name_w, count_w, range_w = self._column_widths(ranges)
+        header = [
+            "",
+            "可用資料集：",
+            f"     {'名稱'.ljust(name_w)}  {'Pin 筆數'.rjust(count_w)}  {'Pin 範圍 (W)'.ljust(range_w)}",
+            f"     {'-' * name_w}  {'-' * count_w}  {'-' * range_w}",
+        ]
+        row = f" {{}} {{:>2}}) {{:<{name_w}}}  {{:>{count_w}}}  {{:<{range_w}}}"
         while True:
-            print("\n可用資料集：")
-            name_w, count_w, range_w = self._column_widths()
-            header_name = "名稱".ljust(name_w)
-            header_count = "Pin 筆數".rjust(count_w)
-            header_range = "Pin 範圍 (W)".ljust(range_w)
-            print(f"     {header_name}  {header_count}  {header_range}")
-            print(f"     {'-' * name_w}  {'-' * count_w}  {'-' * range_w}")
-            for idx, entry in enumerate(self.datasets, start=1):
+            lines = list(header)
+            for idx, (entry, pin_range) in enumerate(zip(self.datasets, ranges), start=1):
                 prefix = "*" if entry.name == self.current_dataset else " "
-                label = f" {prefix} {idx:>2}) "
-                name_field = entry.name.ljust(name_w)
-                count_field = str(entry.pin_count).rjust(count_w)
-                range_field = self._format_pin_range(entry).ljust(range_w)
-                print(f"{label}{name_field}  {count_field}  {range_field}")
+                lines.append(row.format(prefix, idx, entry.name, entry.pin_count, pin_range))
+            _write_lines(lines)
             raw = input(f"選擇資料集 (Enter 使用 {self.current_dataset}): ").strip()
             if not raw:
                 return self.current_dataset
@@ -166,10 +281,10 @@ class ChartCLI:
 
         return self._multi_select_from_names(available, min_count=2)
 
-    def _column_widths(self) -> tuple[int, int, int]:
+    def _column_widths(self, ranges: List[str]) -> tuple[int, int, int]:
         name_w = max(len("名稱"), *(len(entry.name) for entry in self.datasets))
         count_w = max(len("Pin 筆數"), *(len(str(entry.pin_count)) for entry in self.datasets))
-        range_w = max(len("Pin 範圍 (W)"), *(len(self._format_pin_range(entry)) for entry in self.datasets))
+        range_w = max(len("Pin 範圍 (W)"), *(len(pin_range) for pin_range in ranges))
         return name_w, count_w, range_w
 
     @staticmethod
@@ -212,9 +327,10 @@ class ChartCLI:
 
         while True:
             if raw is None:
-                print("\n可選擇的資料集：")
-                for idx, name in enumerate(available_sorted, start=1):
-                    print(f"  {idx:>2}) {name}")
+                _write_lines(
+                    ["", "可選擇的資料集："]
+                    + [f"  {idx:>2}) {name}" for idx, name in enumerate(available_sorted, start=1)]
+                )
                 raw = input("輸入選項（支援 1-3,5 或 r2=32 / 32 形式）: ").strip()
             if not raw:
                 print("⚠️ 請至少輸入一個資料集。")
@@ -270,11 +386,11 @@ class ChartCLI:
     # ------------------------------------------------------------------ pin & dataset filtering
     def prompt_pin_value(self) -> float:
         try:
-            df = self._get_stats_df()
+            self._get_stats_df()
         except FileNotFoundError as exc:
             raise SystemExit(str(exc)) from exc
 
-        pin_values = np.sort(df["pin"].dropna().unique())
+        pin_values = self._pin_values
         if pin_values.size == 0:
             raise SystemExit("統計表中沒有 Pin 資料。")
 
@@ -292,16 +408,20 @@ class ChartCLI:
             except ValueError:
                 print("⚠️ 非法數值，請重新輸入。")
                 continue
-            matches = pin_values[np.isclose(pin_values, value, atol=1e-6)]
-            if matches.size == 0:
-                nearest = pin_values[np.argmin(np.abs(pin_values - value))]
+            # pin_values is sorted: the nearest Pin is one of the two around the insert point.
+            idx = int(np.searchsorted(pin_values, value))
+            below = pin_values[max(idx - 1, 0)]
+            above = pin_values[min(idx, pin_values.size - 1)]
+            nearest = below if abs(value - below) <= abs(above - value) else above
+            # Same tolerance as np.isclose(pin_values, value, atol=1e-6).
+            if abs(nearest - value) > 1e-6 + 1e-5 * abs(value):
                 print(f"⚠️ 找不到 {value:g} W，最接近的是 {nearest:g} W。請輸入列表中的值。")
                 continue
-            return float(matches[0])
+            return float(nearest)
 
     def select_datasets_for_pin(self, pin_value: float) -> List[str]:
         df = self._get_stats_df()
-        mask = np.isclose(df["pin"], pin_value, atol=1e-6)
+        mask = df["pin_key"].to_numpy() == pin_key(pin_value)
         available = sorted(df.loc[mask, "dataset"].astype(str).unique())
         if not available:
             raise SystemExit(f"Pin {pin_value:g} W 沒有可用資料集。")
@@ -423,7 +543,7 @@ class ChartCLI:
         if pin_max is not None:
             cmd.extend(["--pin-max", str(pin_max)])
 
-        self.run_command(cmd)
+        self.run_command(cmd, stats_df=self._shared_stats())
 
     def run_density(self) -> None:
         dataset = self.select_dataset()
@@ -453,7 +573,7 @@ class ChartCLI:
         if pin_max is not None:
             cmd.extend(["--pin-max", str(pin_max)])
 
-        self.run_command(cmd)
+        self.run_command(cmd, values_df=self._shared_density_values())
 
     def run_r2_comparison(self) -> None:
         datasets = self.select_multiple_datasets()
@@ -487,7 +607,7 @@ class ChartCLI:
         if pin_max is not None:
             cmd.extend(["--pin-max", str(pin_max)])
 
-        self.run_command(cmd)
+        self.run_command(cmd, stats_df=self._shared_stats())
 
     def run_pin_kde_comparison(self) -> None:
         pin_value = self.prompt_pin_value()
@@ -515,7 +635,11 @@ class ChartCLI:
         cmd.append("--datasets")
         cmd.extend(datasets)
 
-        self.run_command(cmd)
+        self.run_command(
+            cmd,
+            values_df=self._shared_density_values(),
+            stats_df=None if self.isolated else self._get_stats_df(),
+        )
 
     def run_gap(self) -> None:
         dataset = self.select_dataset()
@@ -533,15 +657,44 @@ class ChartCLI:
         self.run_command(cmd)
 
     # ------------------------------------------------------------------ executor
-    def run_command(self, cmd: List[str]) -> None:
+    def run_command(self, cmd: List[str], **frames: pd.DataFrame | None) -> None:
+        """Run ``cmd``; in-process runs also receive the preloaded ``frames``."""
         print("\n----------------------------------------")
         print("執行指令:")
         print(" ".join(cmd))
+        if not self.isolated:
+            self._run_in_process(Path(cmd[1]), cmd[2:], frames)
+            return
         try:
             subprocess.run(cmd, check=True)
         except subprocess.CalledProcessError as exc:
             print(f"⚠️ 指令執行失敗：{exc}")
 
+    @staticmethod
+    def _run_in_process(script: Path, args: List[str], frames: Dict[str, pd.DataFrame | None]) -> None:
+        """Call the script's main() directly so numpy/pandas/matplotlib stay loaded.
+
+        rcParams changed by the run are restored and any figure it left open is
+        closed, so one plot cannot leak into the next.
+        """
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
+        # Imported outside rc_context: the plot modules apply the shared style on import.
+        module = importlib.import_module(script.stem)
+        # Shallow copies: scripts may add or replace columns without touching the cache.
+        shared = {name: frame.copy(deep=False) for name, frame in frames.items() if frame is not None}
+        try:
+            with mpl.rc_context():
+                module.main(args, **shared)
+        except SystemExit as exc:
+            if exc.code not in (None, 0):
+                print(f"⚠️ 指令執行失敗：{exc.code}")
+        except Exception as exc:
+            print(f"⚠️ 指令執行失敗：{type(exc).__name__}: {exc}")
+        finally:
+            plt.close("all")
+
     def main_loop(self) -> None:
         while True:
             print("\n========================================")
@@ -572,8 +725,19 @@ class ChartCLI:
                 print("⚠️ 無效的選項，請重新輸入。")
 
 
-def main() -> None:
-    cli = ChartCLI(DEFAULT_STATS, DEFAULT_VALUES)
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Interactive charting menu for the aggregated datasets.")
+    parser.add_argument(
+        "--isolated",
+        action="store_true",
+        help="Run each plot in a separate Python process instead of in this interpreter",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    cli = ChartCLI(DEFAULT_STATS, DEFAULT_VALUES, isolated=args.isolated)
     cli.main_loop()
 
 
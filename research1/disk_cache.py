@@ -0,0 +1,111 @@
+"""On-disk cache helpers shared by the analysis scripts.
+
+Entries are tied to one revision of a source file through its resolved path,
+modification time and size. Writes go through a temporary file that atomically
+replaces the entry, and are skipped when the cache directory is not writable, so a
+read-only data tree only costs the speed-up.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+Signature = Tuple[str, int, int]
+
+
+def file_signature(path: Path) -> Signature:
+    """``(resolved path, mtime_ns, size)`` of ``path``; changes whenever the file does."""
+    stat = path.stat()
+    return (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def entry_path(cache_dir: Path, source: Path, suffix: str, *extra: object) -> Path:
+    """Cache file for the current revision of ``source``, optionally keyed on ``extra``.
+
+    The name is ``<path digest>-<revision digest><suffix>``, so entries left by older
+    revisions of the same source can be found and evicted by :func:`store_entry`.
+    """
+    resolved, mtime_ns, size = file_signature(source)
+    revision = "|".join(str(part) for part in (mtime_ns, size, *extra))
+    return cache_dir / f"{_digest(resolved)}-{_digest(revision)}{suffix}"
+
+
+def write_atomic(target: Path, write: Callable[[Path], None]) -> bool:
+    """Produce ``target`` by calling ``write`` on a temporary path, then replacing.
+
+    The temporary name keeps ``target``'s final suffix (``np.savez`` relies on it).
+    Returns False, leaving no partial file, when the directory is not writable.
+    """
+    tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp{target.suffix}")
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write(tmp_path)
+        tmp_path.replace(target)
+    except OSError:
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def store_entry(
+    cache_dir: Path,
+    source: Path,
+    suffix: str,
+    write: Callable[[Path], None],
+    *extra: object,
+) -> bool:
+    """Write the :func:`entry_path` entry, then drop the ones older revisions left behind."""
+    entry = entry_path(cache_dir, source, suffix, *extra)
+    if not write_atomic(entry, write):
+        return False
+    prefix = entry.name[: entry.name.index("-") + 1]
+    for stale in cache_dir.glob(f"{prefix}*{suffix}"):
+        # Same length as well: another suffix such as ".fields.npz" also ends in ".npz".
+        if stale != entry and len(stale.name) == len(entry.name):
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+    return True
+
+
+def load_signed(cache_path: Path, signature: Signature) -> Optional[Any]:
+    """Object pickled by :func:`dump_signed`, or None if missing, stale or unreadable."""
+    try:
+        with cache_path.open("rb") as handle:
+            cached_signature, value = pickle.load(handle)
+    except Exception:
+        return None
+    return value if cached_signature == signature else None
+
+
+def dump_signed(cache_path: Path, signature: Signature, value: Any) -> bool:
+    """Pickle ``value`` with the ``signature`` of the file it was derived from."""
+
+    def write(tmp_path: Path) -> None:
+        with tmp_path.open("wb") as handle:
+            pickle.dump((signature, value), handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return write_atomic(cache_path, write)
+
+
+__all__ = [
+    "Signature",
+    "file_signature",
+    "entry_path",
+    "write_atomic",
+    "store_entry",
+    "load_signed",
+    "dump_signed",
+]
@@ -7,7 +7,7 @@ import argparse
 import sys
 from pathlib import Path
 import re
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 try:  # pragma: no cover - environment dependency guard
     import numpy as np
@@ -27,6 +27,15 @@ except ImportError as exc:
     print("Error: meshio is required to read VTU files (pip install meshio).", file=sys.stderr)
     raise SystemExit(1) from exc
 
+try:  # pragma: no cover - optional dependency
+    from vtkmodules.util.numpy_support import vtk_to_numpy
+    from vtkmodules.vtkIOXML import vtkXMLUnstructuredGridReader
+except ImportError:  # pragma: no cover
+    vtkXMLUnstructuredGridReader = None
+
+from disk_cache import entry_path, store_entry
+from table_io import write_table
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -61,22 +70,40 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="Output CSV file containing per-Pin summary statistics",
     )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write zstd Parquet copies of both tables (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse the VTU file instead of reusing density fields cached in <vtu dir>/.cache",
+    )
     return parser.parse_args()
 
 
+# Per-step statistic columns, in output order after the step keys.
+_COUNT_STATS = ("total_points", "valid_points", "missing_points")
+_SUMMARY_STATS = ("mean", "std", "min", "q1", "median", "q3", "max")
+_QUANTILES = (0.0, 0.25, 0.5, 0.75, 1.0)
+_DENSITY_RE = re.compile(r"electron_density(?:_\d+)?$", re.IGNORECASE)
+_STEP_RE = re.compile(r"_(\d+)$")
+_FIELDS_SUFFIX = ".fields.npz"
+
+
 def _extract_step_index(field_name: str) -> int:
-    match = re.search(r"_(\d+)$", field_name)
+    match = _STEP_RE.search(field_name)
     if match:
         return int(match.group(1))
     return 1
 
 
 def _select_density_fields(point_data: Dict[str, np.ndarray]) -> List[Tuple[str, np.ndarray]]:
-    pattern = re.compile(r"electron_density(?:_\d+)?$", re.IGNORECASE)
     selected: List[Tuple[str, np.ndarray]] = []
 
     for name, array in point_data.items():
-        if not pattern.search(name):
+        if not _DENSITY_RE.search(name):
             continue
         np_array = np.asarray(array)
         if np_array.ndim == 2 and np_array.shape[1] == 1:
@@ -97,8 +124,7 @@ def _build_tables(
     pin_values: Iterable[float],
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     pin_list = list(pin_values)
-    stats_rows: List[Dict[str, float]] = []
-    value_rows: List[Dict[str, float]] = []
+    value_frames: List[pd.DataFrame] = []
 
     if len(density_fields) != len(pin_list):
         raise ValueError(
@@ -106,67 +132,125 @@ def _build_tables(
             f"({len(density_fields)})."
         )
 
-    for step_index, ((field_name, raw_values), pin) in enumerate(zip(density_fields, pin_list), start=1):
+    # Statistics are filled column-wise into arrays preallocated per time step.
+    n_steps = len(pin_list)
+    pins = np.asarray(pin_list, dtype=np.float64)
+    time_steps = np.arange(1, n_steps + 1, dtype=np.int64)
+    counts = np.empty((n_steps, len(_COUNT_STATS)), dtype=np.int64)
+    summary = np.empty((n_steps, len(_SUMMARY_STATS)), dtype=np.float64)
+
+    for row, (field_name, raw_values) in enumerate(density_fields):
         flattened = raw_values.reshape(-1)
         total_points = flattened.size
-        valid_mask = np.isfinite(flattened)
-        valid_indices = np.nonzero(valid_mask)[0]
-        valid_values = flattened[valid_mask]
-        missing_points = total_points - valid_values.size
+        with np.errstate(over="ignore", invalid="ignore"):
+            all_finite = bool(np.isfinite(np.sum(flattened)))
+        if all_finite:
+            # NaN/inf would propagate into the sum, so every point is valid: skip the
+            # mask allocation and gather copy. (An overflowing sum takes the slow path.)
+            valid_indices = np.arange(total_points)
+            valid_values = flattened
+        else:
+            valid_mask = np.isfinite(flattened)
+            valid_indices = np.nonzero(valid_mask)[0]
+            valid_values = flattened[valid_mask]
 
         if valid_values.size == 0:
             raise ValueError(f"Field '{field_name}' contains no finite values.")
 
-        stats = {
-            "pin": float(pin),
+        counts[row] = (total_points, valid_values.size, total_points - valid_values.size)
+        summary[row, 0] = np.mean(valid_values)
+        summary[row, 1] = np.std(valid_values, ddof=0)
+        # One partitioning pass for the five order statistics.
+        summary[row, 2:] = np.quantile(valid_values, _QUANTILES)
+
+        # Columns straight from the arrays; the step's keys and statistics are scalars
+        # broadcast over its points, which replaces a join against the stats table.
+        columns = {
+            "pin": pins[row],
             "field_name": field_name,
-            "time_step": step_index,
-            "total_points": int(total_points),
-            "valid_points": int(valid_values.size),
-            "missing_points": int(missing_points),
-            "mean": float(np.mean(valid_values)),
-            "std": float(np.std(valid_values, ddof=0)),
-            "min": float(np.min(valid_values)),
-            "q1": float(np.percentile(valid_values, 25)),
-            "median": float(np.median(valid_values)),
-            "q3": float(np.percentile(valid_values, 75)),
-            "max": float(np.max(valid_values)),
+            "time_step": time_steps[row],
+            "point_index": valid_indices.astype(np.int64, copy=False),
+            "value": valid_values.astype(np.float64, copy=False),
         }
-        stats_rows.append(stats)
-
-        for point_idx, value in zip(valid_indices, valid_values):
-            value_rows.append(
-                {
-                    "pin": float(pin),
-                    "field_name": field_name,
-                    "time_step": step_index,
-                    "point_index": int(point_idx),
-                    "value": float(value),
-                }
-            )
-
-    stats_df = pd.DataFrame(stats_rows)
-    values_df = pd.DataFrame(value_rows)
-    values_df = values_df.merge(
-        stats_df,
-        on=["pin", "field_name", "time_step"],
-        how="left",
-    )
+        columns.update(zip(_COUNT_STATS, counts[row]))
+        columns.update(zip(_SUMMARY_STATS, summary[row]))
+        value_frames.append(pd.DataFrame(columns))
+
+    stats_columns = {
+        "pin": pins,
+        "field_name": [field_name for field_name, _ in density_fields],
+        "time_step": time_steps,
+    }
+    stats_columns.update(zip(_COUNT_STATS, counts.T))
+    stats_columns.update(zip(_SUMMARY_STATS, summary.T))
+    stats_df = pd.DataFrame(stats_columns)
+    values_df = pd.concat(value_frames, ignore_index=True)
 
     return values_df, stats_df
 
 
+def _read_point_data(vtu_path: Path) -> Dict[str, np.ndarray]:
+    """Point data of a VTU file; through VTK, only the electron-density arrays are parsed."""
+    if vtkXMLUnstructuredGridReader is None:
+        return meshio.read(str(vtu_path)).point_data
+
+    reader = vtkXMLUnstructuredGridReader()
+    reader.SetFileName(str(vtu_path))
+    reader.UpdateInformation()
+    selection = reader.GetPointDataArraySelection()
+    for i in range(selection.GetNumberOfArrays()):
+        name = selection.GetArrayName(i)
+        selection.SetArraySetting(name, int(_DENSITY_RE.search(name) is not None))
+    reader.GetCellDataArraySelection().DisableAllArrays()
+    reader.Update()
+    arrays = reader.GetOutput().GetPointData()
+    # The fields are cached and reduced after this function returns, when the reader's
+    # output is gone, so take copies instead of vtk_to_numpy views.
+    return {
+        arrays.GetArrayName(i): np.array(vtk_to_numpy(arrays.GetArray(i)))
+        for i in range(arrays.GetNumberOfArrays())
+    }
+
+
+def _read_density_fields(
+    vtu_path: Path,
+    cache_dir: Optional[Path] = None,
+) -> List[Tuple[str, np.ndarray]]:
+    """Electron-density fields of a VTU file, reusing ``cache_dir`` while it is unchanged."""
+    if cache_dir is not None:
+        cache_path = entry_path(cache_dir, vtu_path, _FIELDS_SUFFIX)
+        if cache_path.exists():
+            with np.load(cache_path) as cached:
+                return [(name, cached[name]) for name in cached.files]
+
+    density_fields = _select_density_fields(_read_point_data(vtu_path))
+    if cache_dir is not None:
+        # Saved in step order; the archive keeps that order in ``files``.
+        store_entry(
+            cache_dir,
+            vtu_path,
+            _FIELDS_SUFFIX,
+            lambda tmp_path: np.savez(tmp_path, **dict(density_fields)),
+        )
+    return density_fields
+
+
 def convert_vtu_to_tables(
     vtu_path: Path,
     pin_values: Iterable[float],
+    cache_dir: Optional[Path] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Read a VTU file and build per-point and per-Pin tables."""
+    """Read a VTU file and build per-point and per-Pin tables.
+
+    With ``cache_dir`` set, the parsed density fields are kept there as ``.npz`` so a
+    rerun (for example with a different Pin list) skips the VTU parse.
+    """
 
-    if not Path(vtu_path).exists():
+    vtu_path = Path(vtu_path)
+    if not vtu_path.exists():
         raise FileNotFoundError(f"VTU file not found: {vtu_path}")
 
-    mesh = meshio.read(str(vtu_path))
-    density_fields = _select_density_fields(mesh.point_data)
+    density_fields = _read_density_fields(vtu_path, cache_dir)
 
     return _build_tables(density_fields, pin_values)
 
@@ -175,7 +259,8 @@ def main() -> None:
     args = parse_args()
 
     try:
-        values_df, stats_df = convert_vtu_to_tables(args.vtu, args.pin_values)
+        cache_dir = None if args.no_cache else args.vtu.parent / ".cache"
+        values_df, stats_df = convert_vtu_to_tables(args.vtu, args.pin_values, cache_dir)
     except FileNotFoundError as exc:
         raise SystemExit(str(exc)) from exc
     except ValueError as exc:
@@ -184,8 +269,8 @@ def main() -> None:
     args.values_output.parent.mkdir(parents=True, exist_ok=True)
     args.stats_output.parent.mkdir(parents=True, exist_ok=True)
 
-    values_df.to_csv(args.values_output, index=False)
-    stats_df.to_csv(args.stats_output, index=False)
+    write_table(values_df, args.values_output, parquet=args.parquet)
+    write_table(stats_df, args.stats_output, parquet=args.parquet)
 
     print(f"Saved per-point data with statistics to {args.values_output}")
     print(f"Saved per-pin summary statistics to {args.stats_output}")
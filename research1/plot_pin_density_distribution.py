@@ -4,15 +4,17 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Sequence
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import numpy as np
 import pandas as pd
-from scipy.stats import gaussian_kde
 
+from kde import gaussian_kde_curves
 from plot_style import (
     DISTRIBUTION_AXES_STYLE,
     FigureLayout,
@@ -22,6 +24,7 @@ from plot_style import (
     style_axes,
     style_colorbar,
 )
+from table_io import density_row_mask, iter_table
 
 apply_common_style()
 
@@ -38,25 +41,41 @@ LAYOUT = FigureLayout(
 LINE_WIDTH_PT = 1.44
 YLABEL_PAD_PT = 35.0
 YLABEL_Y_FRAC = 0.4
+LOAD_CHUNK_ROWS = 1_000_000
 
 
 def load_density_values(csv_path: Path) -> pd.DataFrame:
     if not csv_path.exists():
         raise FileNotFoundError(f"Required CSV not found: {csv_path}")
 
-    df = pd.read_csv(csv_path)
     required_columns = {"dataset", "pin", "field_name", "value"}
-    missing = required_columns.difference(df.columns)
-    if missing:
-        missing_list = ", ".join(sorted(missing))
-        raise ValueError(f"CSV is missing required columns: {missing_list}")
-
-    mask = df["field_name"].str.contains("electron_density", case=False, na=False)
-    filtered = df.loc[mask, ["dataset", "pin", "value"]].copy()
-    filtered = filtered[np.isfinite(filtered["value"]) & (filtered["value"] > 0)]
+    kept: List[pd.DataFrame] = []
+    # Filter chunk by chunk so rejected rows and unused columns never accumulate.
+    for chunk in iter_table(
+        csv_path,
+        columns=["dataset", "pin", "field_name", "value"],
+        chunksize=LOAD_CHUNK_ROWS,
+        dtype={"dataset": "category", "field_name": "category"},
+    ):
+        missing = required_columns.difference(chunk.columns)
+        if missing:
+            missing_list = ", ".join(sorted(missing))
+            raise ValueError(f"CSV is missing required columns: {missing_list}")
+
+        mask = density_row_mask(chunk)
+        kept.append(chunk.loc[mask, ["dataset", "pin", "value"]])
+
+    filtered = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
     if filtered.empty:
         raise ValueError("No positive electron-density values found in CSV.")
 
+    # Sorted by Pin so per-Pin lookups (e.g. plot_pin_r2_kde) can binary-search.
+    filtered = filtered.sort_values("pin", kind="stable", ignore_index=True)
+    # Chunks may carry different category sets; re-encode once over the result.
+    filtered["dataset"] = filtered["dataset"].astype("category")
+    pins32 = filtered["pin"].to_numpy(dtype=np.float32)
+    if np.array_equal(pins32, filtered["pin"].to_numpy(dtype=float)):
+        filtered["pin"] = pins32  # exact for the usual integral Pin values
     return filtered
 
 
@@ -71,16 +90,18 @@ def select_pin_values(
         if df.empty:
             raise ValueError(f"Dataset '{dataset}' has no electron-density values.")
 
-    pins = df["pin"].unique()
     if pin_min is not None:
-        pins = pins[pins >= pin_min]
+        df = df[df["pin"] >= pin_min]
     if pin_max is not None:
-        pins = pins[pins <= pin_max]
+        df = df[df["pin"] <= pin_max]
 
+    # One grouping pass instead of an equality scan over all rows for every Pin.
     selected: Dict[float, np.ndarray] = {}
-    for pin in sorted(pins):
-        values = df.loc[df["pin"] == pin, "value"].to_numpy(dtype=float)
-        values = values[np.isfinite(values) & (values > 0)]
+    for pin, series in df.groupby("pin", sort=True)["value"]:
+        values = series.to_numpy(dtype=float)
+        keep = values > 0
+        keep &= values < np.inf
+        values = values[keep]
         if values.size >= 2:
             selected[float(pin)] = np.log10(values)
     return selected
@@ -100,11 +121,25 @@ def plot_distributions(pin_data: Dict[float, np.ndarray], dataset: str, output:
         raise ValueError('All Pin values must be positive to use a log color scale.')
     norm = mpl.colors.LogNorm(vmin=pins.min(), vmax=pins.max())
 
-    for pin in pins:
-        values = pin_data[pin]
-        kde = gaussian_kde(values)
-        x = np.linspace(values.min(), values.max(), 200)
-        ax.plot(x, kde(x), color=cmap(norm(pin)), lw=LINE_WIDTH_PT)
+    sample_sets = [pin_data[pin] for pin in pins]
+    grids = np.linspace(
+        [values.min() for values in sample_sets],
+        [values.max() for values in sample_sets],
+        200,
+        axis=1,
+    )
+    densities = gaussian_kde_curves(sample_sets, grids)
+    segments = np.stack((grids, densities), axis=-1)
+    # A single collection artist instead of one Line2D per Pin; drawn in Pin order.
+    curves = LineCollection(
+        segments,
+        colors=cmap(norm(pins)),
+        linewidths=LINE_WIDTH_PT,
+        capstyle=mpl.rcParams["lines.solid_capstyle"],
+        joinstyle=mpl.rcParams["lines.solid_joinstyle"],
+    )
+    ax.add_collection(curves)
+    ax.autoscale_view()
 
     ax.set_xlabel(r"$\log_{10}(\mathrm{Electron~Density}~(1/m^{3}))$")
     set_ylabel_with_offset(
@@ -136,7 +171,8 @@ def plot_distributions(pin_data: Dict[float, np.ndarray], dataset: str, output:
     plt.close(fig)
 
 
-def parse_args() -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Plot electron-density distribution curves for Pins in a given range."
     )
@@ -166,12 +202,19 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="Output image path; omit to show the figure interactively",
     )
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
+
 
-def main() -> None:
-    args = parse_args()
+def main(argv: Sequence[str] | None = None, *, values_df: pd.DataFrame | None = None) -> None:
+    """Entry point; ``values_df`` may be a :func:`load_density_values` result for ``--csv``."""
+    args = parse_args(argv)
 
-    values_df = load_density_values(args.csv)
+    if values_df is None:
+        values_df = load_density_values(args.csv)
     try:
         pin_data = select_pin_values(values_df, args.dataset, args.pin_min, args.pin_max)
     except ValueError as exc:
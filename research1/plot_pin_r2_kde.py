@@ -4,15 +4,22 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from scipy.stats import gaussian_kde
 
+try:  # pragma: no cover - optional dependency
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pq = None
+
+from disk_cache import entry_path, store_entry
+from kde import gaussian_kde_curves
 from plot_style import (
     DISTRIBUTION_AXES_STYLE,
     FigureLayout,
@@ -20,6 +27,14 @@ from plot_style import (
     create_figure,
     style_axes,
 )
+from table_io import (
+    PARQUET_COMPRESSION,
+    PIN_KEY_SCALE,
+    density_row_mask,
+    pin_key,
+    pin_keys,
+    read_table,
+)
 
 apply_common_style()
 
@@ -34,7 +49,8 @@ LAYOUT = FigureLayout(
 LINE_WIDTH_PT = 1.5
 
 
-def parse_args() -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Compare electron-density KDE curves for multiple datasets sharing a Pin value.",
     )
@@ -67,30 +83,70 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="Output image path; omit to show the figure interactively.",
     )
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
+
+
+_DENSITY_SUFFIX = ".density.parquet"
 
 
 def load_values(path: Path) -> pd.DataFrame:
+    """Electron-density rows sorted by Pin.
+
+    With pyarrow installed the rows are kept as Parquet in ``<csv dir>/.cache`` and
+    reused while ``path`` is unchanged; rewriting the CSV replaces the entry.
+    """
     if not path.exists():
         raise SystemExit(f"Values CSV not found: {path}")
-    df = pd.read_csv(path)
+    if pq is None:
+        return _read_density_rows(path)
+    cache_dir = path.parent / ".cache"
+    cache_path = entry_path(cache_dir, path, _DENSITY_SUFFIX)
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+    df = _read_density_rows(path)
+    store_entry(
+        cache_dir,
+        path,
+        _DENSITY_SUFFIX,
+        lambda tmp_path: df.to_parquet(tmp_path, index=False, compression=PARQUET_COMPRESSION),
+    )
+    return df
+
+
+def _read_density_rows(path: Path) -> pd.DataFrame:
+    df = read_table(path, columns=["dataset", "pin", "field_name", "value"])
     needed = {"dataset", "pin", "field_name", "value"}
     missing = needed.difference(df.columns)
     if missing:
         raise SystemExit(f"Values CSV missing columns: {', '.join(sorted(missing))}")
-    mask = df["field_name"].str.contains("electron_density", case=False, na=False)
-    df = df.loc[mask, ["dataset", "pin", "value"]].copy()
-    df = df[np.isfinite(df["value"]) & (df["value"] > 0)]
+    mask = density_row_mask(df)
+    df = df.loc[mask, ["dataset", "pin", "value"]]
     if df.empty:
         raise SystemExit("No positive electron-density values available.")
+    # Sorted by Pin so gather_kde_inputs can locate one power by binary search.
+    df = df.sort_values("pin", kind="stable", ignore_index=True)
+    df["dataset"] = df["dataset"].astype("category")
     return df
 
 
-def validate_datasets(stats_path: Path, datasets: List[str], pin_value: float) -> None:
-    if not stats_path.exists():
+def validate_datasets(
+    stats_path: Path,
+    datasets: List[str],
+    pin_value: float,
+    stats_df: pd.DataFrame | None = None,
+) -> None:
+    if stats_df is not None:
+        df = stats_df
+    elif not stats_path.exists():
         return
-    df = pd.read_csv(stats_path, usecols=["dataset", "pin"])
-    mask = np.isclose(df["pin"], pin_value, atol=1e-6)
+    else:
+        df = read_table(stats_path, columns=["dataset", "pin"])
+    keys = df["pin_key"].to_numpy() if "pin_key" in df else pin_keys(df["pin"].to_numpy())
+    mask = keys == pin_key(pin_value)
     available = set(df.loc[mask, "dataset"].astype(str))
     missing = [ds for ds in datasets if ds not in available]
     if missing:
@@ -101,11 +157,26 @@ def validate_datasets(stats_path: Path, datasets: List[str], pin_value: float) -
 
 def gather_kde_inputs(df: pd.DataFrame, datasets: List[str], pin_value: float) -> Dict[str, np.ndarray]:
     result: Dict[str, np.ndarray] = {}
+    # Filter on Pin once, then split the matching rows by dataset in one pass.
+    rows = df
+    if df["pin"].is_monotonic_increasing:
+        # Binary-search the only rows whose key can equal the target's.
+        pins = df["pin"].to_numpy()
+        reach = 1.0 / PIN_KEY_SCALE
+        start = np.searchsorted(pins, pin_value - reach, side="left")
+        stop = np.searchsorted(pins, pin_value + reach, side="right")
+        rows = df.iloc[start:stop]
+    at_pin = rows.loc[pin_keys(rows["pin"].to_numpy()) == pin_key(pin_value), ["dataset", "value"]]
+    groups = {
+        str(name): group["value"].to_numpy(dtype=float)
+        for name, group in at_pin.groupby("dataset", observed=True, sort=False)
+    }
+    empty = np.empty(0)
     for dataset in datasets:
-        mask = (df["dataset"] == dataset) & np.isclose(df["pin"], pin_value, atol=1e-6)
-        subset = df.loc[mask]
-        values = subset["value"].to_numpy(dtype=float)
-        values = values[np.isfinite(values) & (values > 0)]
+        values = groups.get(dataset, empty)
+        keep = values > 0
+        keep &= values < np.inf
+        values = values[keep]
         if values.size < 2:
             raise SystemExit(
                 f"Dataset '{dataset}' has insufficient positive values at Pin={pin_value}."
@@ -124,11 +195,19 @@ def plot_kde_curves(kde_inputs: Dict[str, np.ndarray], pin_value: float, output:
     color_cycle = cmap(np.linspace(0.1, 0.9, num_curves))
 
     handles = []
-    for idx, (dataset, values) in enumerate(sorted(kde_inputs.items())):
-        kde = gaussian_kde(values)
-        x = np.linspace(values.min(), values.max(), 200)
+    names = sorted(kde_inputs)
+    if names:
+        sample_sets = [kde_inputs[name] for name in names]
+        grids = np.linspace(
+            [values.min() for values in sample_sets],
+            [values.max() for values in sample_sets],
+            200,
+            axis=1,
+        )
+        densities = gaussian_kde_curves(sample_sets, grids)
+    for idx, dataset in enumerate(names):
         color = color_cycle[idx % len(color_cycle)]
-        handle, = ax.plot(x, kde(x), color=color, lw=LINE_WIDTH_PT, label=dataset)
+        handle, = ax.plot(grids[idx], densities[idx], color=color, lw=LINE_WIDTH_PT, label=dataset)
         handles.append(handle)
 
     ax.set_xlabel(r"$\log_{10}(\mathrm{Electron~Density}~(1/m^{3}))$")
@@ -149,11 +228,23 @@ def plot_kde_curves(kde_inputs: Dict[str, np.ndarray], pin_value: float, output:
     plt.close(fig)
 
 
-def main() -> None:
-    args = parse_args()
+def main(
+    argv: Sequence[str] | None = None,
+    *,
+    values_df: pd.DataFrame | None = None,
+    stats_df: pd.DataFrame | None = None,
+) -> None:
+    """Entry point; callers that already loaded the inputs can pass them in.
+
+    ``values_df`` must be the filtered electron-density rows (as from
+    :func:`load_values`; Pin-sorted rows get a binary-search lookup) and ``stats_df``
+    needs the ``dataset``/``pin`` columns.
+    """
+    args = parse_args(argv)
 
-    values_df = load_values(args.csv)
-    validate_datasets(args.stats, args.datasets, args.pin)
+    if values_df is None:
+        values_df = load_values(args.csv)
+    validate_datasets(args.stats, args.datasets, args.pin, stats_df)
     kde_inputs = gather_kde_inputs(values_df, args.datasets, args.pin)
     plot_kde_curves(kde_inputs, args.pin, args.output)
 
@@ -4,8 +4,10 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 import sys
+from typing import Sequence
 
 try:  # pragma: no cover - environment dependency guard
     import matplotlib.pyplot as plt
@@ -26,11 +28,13 @@ except ImportError as exc:
     raise SystemExit(1) from exc
 
 from plot_style import SUMMARY_AXES_STYLE, apply_common_style, style_axes
+from table_io import read_table
 
 apply_common_style()
 
 
-def parse_args() -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Plot aggregated Pin vs. electron-density statistics from data/all_stats.csv."
     )
@@ -74,16 +78,33 @@ def parse_args() -> argparse.Namespace:
         default="linear",
         help="Axis scaling: linear or log-log (default: linear)",
     )
-    return parser.parse_args()
+    return parser
 
 
-def main() -> None:
-    args = parse_args()
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
-    if not args.stats.exists():
-        raise SystemExit(f"Statistics file not found: {args.stats}")
 
-    stats_df = pd.read_csv(args.stats)
+def fit_line(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """Least-squares ``(slope, intercept)`` of ``y`` on ``x`` in closed form.
+
+    Same result as ``np.polyfit(x, y, 1)`` without building the Vandermonde system.
+    """
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    slope = float(np.dot(dx, y - y_mean) / np.dot(dx, dx))
+    return slope, float(y_mean - slope * x_mean)
+
+
+def main(argv: Sequence[str] | None = None, *, stats_df: pd.DataFrame | None = None) -> None:
+    """Entry point; ``stats_df`` lets a caller that already loaded ``--stats`` reuse it."""
+    args = parse_args(argv)
+
+    if stats_df is None:
+        if not args.stats.exists():
+            raise SystemExit(f"Statistics file not found: {args.stats}")
+        stats_df = read_table(args.stats, columns=["dataset", "pin", "mode", "max", "min"])
 
     required_columns = {"dataset", "pin", "mode", "max", "min"}
     missing = required_columns.difference(stats_df.columns)
@@ -182,7 +203,11 @@ def main() -> None:
 
             log_x = np.log10(series_pins[positive_mask])
             log_y = np.log10(series_vals[positive_mask])
-            slope, intercept = np.polyfit(log_x, log_y, 1)
+            if np.ptp(log_x) == 0:
+                print(f"Warning: log-log fit needs at least two distinct Pin values ({label})",
+                      file=sys.stderr)
+                continue
+            slope, intercept = fit_line(log_x, log_y)
             x_fit = np.linspace(log_x.min(), log_x.max(), 200)
             y_fit = slope * x_fit + intercept
             fit_handle, = ax.plot(
@@ -216,6 +241,7 @@ def main() -> None:
         args.output.parent.mkdir(parents=True, exist_ok=True)
         fig.savefig(args.output, dpi=300)
         print(f"Saved plot to {args.output}")
+    plt.close(fig)
 
 
 if __name__ == "__main__":
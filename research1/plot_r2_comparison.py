@@ -5,8 +5,9 @@ from __future__ import annotations
 
 import argparse
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Sequence
 
 import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgb
@@ -14,9 +15,13 @@ import numpy as np
 import pandas as pd
 
 from plot_style import SUMMARY_AXES_STYLE, apply_common_style, style_axes
+from table_io import read_table
 
 apply_common_style()
 
+# 支援 r2= 或 r= 格式
+_DATASET_VALUE_RE = re.compile(r"r2?=([0-9.]+)")
+
 
 def normalize_dataset_name(raw: str) -> str:
     raw = raw.strip()
@@ -24,14 +29,13 @@ def normalize_dataset_name(raw: str) -> str:
         raise ValueError("Empty dataset identifier provided.")
     if raw.upper() == "ALL":
         return "ALL"
-    if raw.lower().startswith("r2="):
-        return raw
-    if raw.lower().startswith("r="):
+    if raw.lower().startswith(("r2=", "r=")):
         return raw
     return f"r={raw}"
 
 
-def parse_args() -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Plot selected r2 datasets on the same Pin vs. density chart (log-log)."
     )
@@ -68,13 +72,17 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="Output image path; omit to show the figure interactively",
     )
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
 
 def load_statistics(path: Path) -> pd.DataFrame:
     if not path.exists():
         raise SystemExit(f"Statistics file not found: {path}")
-    df = pd.read_csv(path)
+    df = read_table(path, columns=["dataset", "pin", "mode", "max", "min"])
     needed = {"dataset", "pin", "mode", "max", "min"}
     missing = needed.difference(df.columns)
     if missing:
@@ -90,18 +98,21 @@ def select_dataset_curve(
     pin_min: float | None,
     pin_max: float | None,
 ) -> tuple[np.ndarray, np.ndarray]:
-    subset = df[df["dataset"] == dataset]
-    if subset.empty:
+    # One combined row mask; no intermediate frames per filter.
+    mask = np.array(df["dataset"] == dataset, dtype=bool)
+    if not mask.any():
         raise SystemExit(f"Dataset '{dataset}' not found in statistics table.")
+    all_pins = df["pin"].to_numpy(dtype=float)
     if pin_min is not None:
-        subset = subset[subset["pin"] >= pin_min]
+        mask &= all_pins >= pin_min
     if pin_max is not None:
-        subset = subset[subset["pin"] <= pin_max]
-    subset = subset.sort_values("pin")
-    pins = subset["pin"].to_numpy(dtype=float)
-    values = subset[stat].to_numpy(dtype=float)
-    mask = (pins > 0) & (values > 0)
-    if mask.sum() < len(pins):
+        mask &= all_pins <= pin_max
+    rows = np.flatnonzero(mask)
+    pins = all_pins[rows]
+    order = np.argsort(pins, kind="stable")
+    pins = pins[order]
+    values = df[stat].to_numpy(dtype=float)[rows[order]]
+    if not ((pins > 0).all() and (values > 0).all()):
         raise SystemExit(
             f"Dataset '{dataset}' contains non-positive values for log scaling."
         )
@@ -111,9 +122,11 @@ def select_dataset_curve(
         )
     return pins, values
 
-def main() -> None:
-    args = parse_args()
-    stats_df = load_statistics(args.stats)
+def main(argv: Sequence[str] | None = None, *, stats_df: pd.DataFrame | None = None) -> None:
+    """Entry point; ``stats_df`` lets a caller that already loaded ``--stats`` reuse it."""
+    args = parse_args(argv)
+    if stats_df is None:
+        stats_df = load_statistics(args.stats)
 
     datasets = [normalize_dataset_name(name) for name in args.datasets]
     if len(datasets) < 2:
@@ -124,8 +137,7 @@ def main() -> None:
     fig, ax = plt.subplots(figsize=(10, 6))
 
     def parse_value(name: str) -> float | None:
-        # 支援 r2= 或 r= 格式
-        m = re.match(r"r2?=([0-9.]+)", name)
+        m = _DATASET_VALUE_RE.match(name)
         if not m:
             return None
         try:
@@ -220,6 +232,7 @@ def main() -> None:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         fig.savefig(output_path, dpi=300)
         print(f"Saved plot to {output_path}")
+    plt.close(fig)
 
 
 if __name__ == "__main__":
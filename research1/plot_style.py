@@ -7,6 +7,8 @@ from typing import Any, Mapping, Tuple
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 # ---------------------------------------------------------------------------
 # Global style helpers
@@ -126,10 +128,19 @@ def create_figure(
     *,
     include_colorbar: bool = False,
     dpi: int = 300,
+    headless: bool = False,
 ) -> Tuple[mpl.figure.Figure, mpl.axes.Axes, mpl.axes.Axes | None]:
-    """Create a figure and axes following the provided layout."""
+    """Create a figure and axes following the provided layout.
+
+    With ``headless`` the figure is drawn on its own Agg canvas instead of through
+    pyplot, so it can be saved without touching the process-wide pyplot backend.
+    """
     layout = layout or DEFAULT_LAYOUT
-    fig = plt.figure(figsize=layout.figure_size(include_colorbar), dpi=dpi)
+    if headless:
+        fig = Figure(figsize=layout.figure_size(include_colorbar), dpi=dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig = plt.figure(figsize=layout.figure_size(include_colorbar), dpi=dpi)
     ax, cax = layout.add_axes(fig, include_colorbar=include_colorbar)
     return fig, ax, cax
 
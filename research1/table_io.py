@@ -0,0 +1,363 @@
+"""Shared table I/O helpers for the aggregated plasma datasets.
+
+CSV files are the canonical output. When pyarrow is installed, CSVs are written
+through Arrow's C++ writer and parsed by its multithreaded reader, limited to the
+requested columns. Writers can opt in to a zstd-compressed Parquet copy next to each
+CSV; it records the size of the CSV it was written with and is preferred on read
+only while that CSV is unchanged, so column-subset reads skip the text parse.
+
+Arrow's CSVs keep pandas' quoting: the header and values are only quoted when they
+contain a delimiter, quote or newline. Floats are written in Arrow's shortest
+round-trip form rather than pandas' ``repr`` style, e.g. ``5.748681214685396e+15``
+for ``5748681214685396.0`` and ``10`` for ``10.0``. Values read back exactly, and
+the readers here load ``pin`` as float even when every Pin is a whole number.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pc = None
+    pacsv = None
+    pq = None
+
+PARQUET_COMPRESSION = "zstd"
+# Columns read back as float64 even when every CSV value is a whole number.
+_FLOAT_COLUMNS = {"pin": "float64"}
+_CSV_SPECIAL = r'[",\r\n]'
+# Parquet metadata key holding the byte size of the CSV the copy was written with.
+_CSV_SIZE_KEY = "table_io.csv_size"
+# Pins are matched as integer micro-watts; non-numeric Pins get a key no Pin maps to.
+PIN_KEY_SCALE = 1e6
+NO_PIN_KEY = np.iinfo(np.int64).min
+
+
+def parquet_path(csv_path: Path) -> Path:
+    """Location of the Parquet copy that accompanies ``csv_path``."""
+    return csv_path.with_suffix(".parquet")
+
+
+def _fresh_parquet(csv_path: Path) -> Optional[Path]:
+    if pq is None:
+        return None
+    candidate = parquet_path(csv_path)
+    if not candidate.exists():
+        return None
+    if not csv_path.exists():
+        return candidate
+    csv_stat = csv_path.stat()
+    if csv_stat.st_mtime_ns > candidate.stat().st_mtime_ns:
+        return None  # CSV was regenerated after the copy
+    recorded = (pq.read_metadata(candidate).metadata or {}).get(_CSV_SIZE_KEY.encode())
+    if recorded is None or int(recorded) != csv_stat.st_size:
+        return None  # copy from another CSV (or without the size record)
+    return candidate
+
+
+def _drop_parquet(csv_path: Path) -> None:
+    """Remove a Parquet copy the CSV just written over no longer matches."""
+    parquet_path(csv_path).unlink(missing_ok=True)
+
+
+def read_table(csv_path: Path, columns: Sequence[str] | None = None) -> pd.DataFrame:
+    """Read an aggregated table, loading only ``columns`` when given.
+
+    Requested columns that do not exist are silently dropped so callers can keep
+    their own missing-column validation.
+    """
+    source = _fresh_parquet(csv_path)
+    if source is not None:
+        selected: Optional[List[str]] = None
+        if columns is not None:
+            available = set(pq.read_schema(source).names)
+            selected = [col for col in columns if col in available]
+        return pd.read_parquet(source, columns=selected)
+
+    if pacsv is not None:
+        float_types = {col: pa.float64() for col in _FLOAT_COLUMNS}
+        convert = pacsv.ConvertOptions(column_types=float_types)
+        if columns is not None:
+            header = set(_csv_header(csv_path))
+            convert = pacsv.ConvertOptions(
+                column_types=float_types,
+                include_columns=[col for col in columns if col in header],
+            )
+        table = pacsv.read_csv(csv_path, convert_options=convert)
+        for index, field in enumerate(table.schema):
+            if pa.types.is_null(field.type):
+                # All-empty column: read it as float NaN like pandas does, not object None.
+                table = table.set_column(index, field.name, pa.nulls(table.num_rows, pa.float64()))
+        return table.to_pandas()
+
+    if columns is None:
+        return pd.read_csv(csv_path, dtype=_FLOAT_COLUMNS)
+    wanted = set(columns)
+    return pd.read_csv(csv_path, usecols=lambda col: col in wanted, dtype=_FLOAT_COLUMNS)
+
+
+def iter_table(
+    csv_path: Path,
+    columns: Sequence[str] | None = None,
+    *,
+    chunksize: int = 1_000_000,
+    dtype: Dict[str, str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield an aggregated table in row chunks, so callers can filter as they read.
+
+    Column selection follows :func:`read_table`; ``dtype`` is applied to the columns
+    present in each chunk.
+    """
+    source = _fresh_parquet(csv_path)
+    if source is not None:
+        parquet = pq.ParquetFile(source)
+        selected: Optional[List[str]] = None
+        if columns is not None:
+            available = set(parquet.schema_arrow.names)
+            selected = [col for col in columns if col in available]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=selected):
+            chunk = batch.to_pandas()
+            if dtype:
+                chunk = chunk.astype({col: kind for col, kind in dtype.items() if col in chunk})
+            yield chunk
+        return
+
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col in wanted  # noqa: E731
+    dtype = {**_FLOAT_COLUMNS, **(dtype or {})}
+    with pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def _csv_header(csv_path: Path) -> List[str]:
+    with csv_path.open(encoding="utf-8", newline="") as handle:
+        return next(csv.reader(handle), [])
+
+
+def pin_keys(pins) -> np.ndarray:
+    """Integer micro-watt keys of ``pins``, so equal Pins compare exactly."""
+    pins = pd.to_numeric(np.asarray(pins).reshape(-1), errors="coerce").astype(np.float64)
+    keys = np.full(pins.shape, NO_PIN_KEY, dtype=np.int64)
+    finite = np.isfinite(pins)
+    keys[finite] = np.round(pins[finite] * PIN_KEY_SCALE)
+    return keys
+
+
+def pin_key(pin: float) -> int:
+    """Key of a single Pin value, comparable with :func:`pin_keys`."""
+    return round(pin * PIN_KEY_SCALE)
+
+
+def density_row_mask(df: pd.DataFrame) -> np.ndarray:
+    """Rows of a values table holding a positive, finite electron density at a finite Pin."""
+    # Match each distinct field name once and broadcast through the category codes;
+    # code -1 marks a missing field name and picks the trailing False.
+    field = df["field_name"].astype("category")
+    density_fields = np.asarray(
+        field.cat.categories.str.contains("electron_density", case=False, regex=False),
+        dtype=bool,
+    )
+    mask = np.append(density_fields, False)[field.cat.codes.to_numpy()]
+    values = df["value"].to_numpy(dtype=float)
+    # NaN fails every comparison, so these also drop missing values and Pins.
+    mask &= values > 0
+    mask &= values < np.inf
+    mask &= np.abs(df["pin"].to_numpy(dtype=float)) < np.inf
+    return mask
+
+
+def _csv_header_line(names: Sequence[str]) -> bytes:
+    """Header row quoted only where needed, as ``DataFrame.to_csv`` writes it."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(names)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _needs_quoting(column) -> bool:
+    if pa.types.is_dictionary(column.type):
+        return any(_needs_quoting(chunk.dictionary) for chunk in column.chunks)
+    if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+        return False
+    return bool(pc.any(pc.match_substring_regex(column, _CSV_SPECIAL)).as_py())
+
+
+def _write_csv_rows(table, handle) -> None:
+    """Append ``table``'s rows to an open CSV, quoting like pandas' minimal style.
+
+    Arrow's "needed" style quotes every string, so it is only used for tables where
+    some value actually contains a delimiter, quote or newline.
+    """
+    needed = any(_needs_quoting(column) for column in table.itercolumns())
+    options = pacsv.WriteOptions(
+        include_header=False,
+        quoting_style="needed" if needed else "none",
+    )
+    pacsv.write_csv(table, handle, options)
+
+
+def write_table(df: pd.DataFrame, csv_path: Path, *, parquet: bool = False) -> None:
+    """Write ``df`` as CSV, plus a Parquet copy when ``parquet`` is set and pyarrow is available.
+
+    A Parquet copy left by an earlier run is removed when none is written.
+    """
+    if pa is None:
+        df.to_csv(csv_path, index=False)
+        _drop_parquet(csv_path)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with csv_path.open("wb") as handle:
+        handle.write(_csv_header_line(table.column_names))
+        _write_csv_rows(table, handle)
+    if not parquet:
+        _drop_parquet(csv_path)
+        return
+    with pq.ParquetWriter(parquet_path(csv_path), table.schema, compression=PARQUET_COMPRESSION) as writer:
+        writer.write_table(table)
+        writer.add_key_value_metadata({_CSV_SIZE_KEY: str(csv_path.stat().st_size)})
+
+
+class TableWriter:
+    """Append DataFrame chunks to a CSV (and optional Parquet copy) without holding them all.
+
+    Output goes to temporary files that replace the targets only when the context
+    exits cleanly after at least one chunk was written.
+    """
+
+    def __init__(self, csv_path: Path, *, parquet: bool = False) -> None:
+        self.csv_path = csv_path
+        self.parquet = parquet and pa is not None
+        self.chunks_written = 0
+        self._csv_tmp = csv_path.with_suffix(".csv.tmp")
+        self._parquet_tmp = parquet_path(csv_path).with_suffix(".parquet.tmp")
+        self._csv_handle = None
+        self._parquet_writer = None
+        self._schema = None
+
+    def __enter__(self) -> "TableWriter":
+        if pa is None:
+            self._csv_handle = self._csv_tmp.open("w", encoding="utf-8", newline="")
+        else:
+            self._csv_handle = self._csv_tmp.open("wb")
+        return self
+
+    def write(self, df: pd.DataFrame) -> None:
+        if pa is None:
+            df.to_csv(self._csv_handle, header=self.chunks_written == 0, index=False)
+            self.chunks_written += 1
+            return
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._schema is None:
+            self._schema = table.schema
+            self._csv_handle.write(_csv_header_line(table.column_names))
+            if self.parquet:
+                self._parquet_writer = pq.ParquetWriter(
+                    self._parquet_tmp, self._schema, compression=PARQUET_COMPRESSION
+                )
+        # Quoting is chosen per chunk; mixing styles across chunks is still valid CSV.
+        _write_csv_rows(table, self._csv_handle)
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_table(table)
+        self.chunks_written += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._csv_handle is not None:
+            self._csv_handle.close()
+        commit = exc_type is None and self.chunks_written > 0
+        if self._parquet_writer is not None:
+            if commit:
+                csv_size = self._csv_tmp.stat().st_size
+                self._parquet_writer.add_key_value_metadata({_CSV_SIZE_KEY: str(csv_size)})
+            self._parquet_writer.close()
+
+        if commit:
+            self._csv_tmp.replace(self.csv_path)
+        else:
+            self._csv_tmp.unlink(missing_ok=True)
+        if self._parquet_writer is not None:
+            if commit:
+                self._parquet_tmp.replace(parquet_path(self.csv_path))
+            else:
+                self._parquet_tmp.unlink(missing_ok=True)
+        elif commit:
+            _drop_parquet(self.csv_path)
+
+
+class BackgroundTableWriter(TableWriter):
+    """TableWriter that serialises chunks on a worker thread.
+
+    ``write`` only enqueues (blocking once ``max_pending`` chunks are waiting), so the
+    caller keeps working while pandas/Arrow format and write the previous chunk. A
+    failure on the writer thread is re-raised from the next ``write`` or on exit.
+    """
+
+    def __init__(self, csv_path: Path, max_pending: int = 4, *, parquet: bool = False) -> None:
+        super().__init__(csv_path, parquet=parquet)
+        self._queue: "queue.Queue[Optional[pd.DataFrame]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def __enter__(self) -> "BackgroundTableWriter":
+        super().__enter__()
+        self._thread = threading.Thread(target=self._drain, name="table-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def _drain(self) -> None:
+        while True:
+            df = self._queue.get()
+            if df is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks on a dead writer
+            try:
+                super().write(df)
+            except BaseException as exc:  # surfaced on the caller's thread
+                self._error = exc
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(df)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        error = self._error
+        if exc_type is None and error is not None:
+            exc_type, exc = type(error), error
+        super().__exit__(exc_type, exc, tb)
+        if error is not None and exc is error:
+            raise error
+
+
+__all__ = [
+    "PARQUET_COMPRESSION",
+    "PIN_KEY_SCALE",
+    "NO_PIN_KEY",
+    "pin_keys",
+    "pin_key",
+    "density_row_mask",
+    "parquet_path",
+    "read_table",
+    "iter_table",
+    "write_table",
+    "TableWriter",
+    "BackgroundTableWriter",
+]
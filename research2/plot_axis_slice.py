@@ -4,16 +4,19 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Optional, Sequence
 
-import meshio
 import numpy as np
+import matplotlib as mpl
 from matplotlib import colormaps
+from matplotlib.collections import LineCollection
 import matplotlib.pyplot as plt
-from matplotlib.tri import LinearTriInterpolator, Triangulation
+from matplotlib.tri import Triangulation
 
 try:
     from plot_style import (
@@ -34,6 +37,15 @@ except ImportError:  # pragma: no cover
         style_axes,
     )
 
+from plot_radial_slice import (  # type: ignore  # noqa: E402
+    _MeshArrays,
+    _extract_index,
+    _load_arrays,
+    _load_mesh_arrays,
+    case_paths,
+    line_triangles,
+)
+
 
 @dataclass(frozen=True)
 class CaseData:
@@ -49,6 +61,11 @@ class CaseData:
     z_max: float
     radius: float  # cavity radius
 
+    @cached_property
+    def plane_coefficients(self) -> np.ndarray:
+        """Per-triangle ``(a, b, c)`` of the linear density ``a*r + b*z + c``, built once."""
+        return self.triangulation.calculate_plane_coefficients(self.density)
+
 
 @dataclass(frozen=True)
 class AxisSlice:
@@ -65,45 +82,43 @@ class AxisSlice:
 # Mesh loading helpers
 # ---------------------------------------------------------------------------
 
-
-def _find_triangles(mesh: meshio.Mesh) -> np.ndarray:
-    for block in mesh.cells:
-        if block.type.lower().startswith("tri"):
-            return block.data
-    raise ValueError("mesh does not contain triangle cells")
+# Parsing and the <data-dir>/.cache layout come from plot_radial_slice; only the
+# CaseData built from the arrays is specific to this script.
 
 
-def load_case(path: Path) -> CaseData:
-    mesh = meshio.read(path)
-    points = mesh.points
-    r = points[:, 0]
-    z = points[:, 1]
-    density = mesh.point_data.get("Electron_density")
-    if density is None:
-        raise KeyError(f"Electron_density field missing in {path.name}")
-    triangles = _find_triangles(mesh)
-    triangulation = Triangulation(r, z, triangles)
+def _case_from_arrays(path: Path, arrays: _MeshArrays) -> CaseData:
+    r, z, density, triangles = arrays
+    r_max = float(r.max())
     return CaseData(
         index=_extract_index(path.name),
         path=path,
         r=r,
         z=z,
         density=density,
-        triangulation=triangulation,
+        triangulation=Triangulation(r, z, triangles),
         r_min=float(r.min()),
-        r_max=float(r.max()),
+        r_max=r_max,
         z_min=float(z.min()),
         z_max=float(z.max()),
-        radius=float(r.max()),  # cavity radius is r_max
+        radius=r_max,  # cavity radius is r_max
     )
 
 
-def _extract_index(name: str) -> int:
-    start = name.find("(")
-    end = name.find(")", start + 1)
-    if start == -1 or end == -1:
-        raise ValueError(f"unexpected filename format: {name}")
-    return int(name[start + 1 : end])
+def load_case(path: Path, cache_dir: Optional[Path] = None) -> CaseData:
+    """Load one case, reusing arrays cached in ``cache_dir`` while the VTU is unchanged."""
+    return _case_from_arrays(path, _load_arrays(path, cache_dir))
+
+
+def load_cases(
+    paths: Sequence[Path],
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[CaseData]:
+    """Load cases in order, parsing the uncached VTUs on up to ``jobs`` processes."""
+    return [
+        _case_from_arrays(path, arrays)
+        for path, arrays in zip(paths, _load_mesh_arrays(paths, cache_dir, jobs))
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -112,37 +127,54 @@ def _extract_index(name: str) -> int:
 
 
 def sample_axis(case: CaseData, r_target: float, *, samples: int) -> AxisSlice | None:
-    if not (case.r_min - 1e-9 <= r_target <= case.r_max + 1e-9):
-        return None
+    return sample_axes(case, [r_target], samples=samples)[0]
+
+
+def sample_axes(
+    case: CaseData, r_targets: Iterable[float], *, samples: int
+) -> List[AxisSlice | None]:
+    """Sample several radii of one case, sharing its plane coefficients.
+
+    Entries are ``None`` for radii outside the case domain or with too few points.
+    """
+    r_targets = np.asarray(list(r_targets), dtype=float).reshape(-1)
+    results: List[AxisSlice | None] = [None] * r_targets.size
+    inside = np.nonzero(
+        (case.r_min - 1e-9 <= r_targets) & (r_targets <= case.r_max + 1e-9)
+    )[0]
+    if inside.size == 0:
+        return results
 
-    interpolator = LinearTriInterpolator(case.triangulation, case.density)
     z_line = np.linspace(case.z_min, case.z_max, samples)
-    r_line = np.full_like(z_line, r_target)
-    values = interpolator(r_line, z_line)
-
-    if isinstance(values, np.ma.MaskedArray):
-        mask = ~values.mask
-        z_line = z_line[mask]
-        values = values.data[mask]
-
-    values = np.asarray(values)
-    finite = np.isfinite(values)
-    z_line = z_line[finite]
-    values = values[finite]
-    if z_line.size < 2:
-        return None
-
-    h_line = z_line - case.z_min
-    peak_idx = int(np.argmax(values))
-    return AxisSlice(
-        index=case.index,
-        h=h_line,
-        density=values,
-        r_target=r_target,
-        h_peak=float(h_line[peak_idx]),
-        z_peak=float(z_line[peak_idx]),
-        radius=case.radius,
-    )
+    # Points outside the mesh stay NaN, so one isfinite pass marks every gap.
+    values = np.full((inside.size, samples), np.nan)
+    for row, slot in enumerate(inside):
+        r_target = r_targets[slot]
+        tri_index = line_triangles(case.triangulation, r_target, z_line, axis="r")
+        hit = tri_index >= 0
+        # Evaluate a*r + b*z + c on the plane of each located triangle.
+        coeffs = case.plane_coefficients[tri_index[hit]]
+        values[row, hit] = coeffs[:, 0] * r_target + coeffs[:, 1] * z_line[hit] + coeffs[:, 2]
+    valid = np.isfinite(values)
+
+    for row, slot in enumerate(inside):
+        keep = valid[row]
+        if np.count_nonzero(keep) < 2:
+            continue
+        z_kept = z_line[keep]
+        density = values[row, keep]
+        h_line = z_kept - case.z_min
+        peak_idx = int(np.argmax(density))
+        results[slot] = AxisSlice(
+            index=case.index,
+            h=h_line,
+            density=density,
+            r_target=float(r_targets[slot]),
+            h_peak=float(h_line[peak_idx]),
+            z_peak=float(z_kept[peak_idx]),
+            radius=case.radius,
+        )
+    return results
 
 
 # ---------------------------------------------------------------------------
@@ -150,7 +182,8 @@ def sample_axis(case: CaseData, r_target: float, *, samples: int) -> AxisSlice |
 # ---------------------------------------------------------------------------
 
 
-def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Plot electron-density vs height along the symmetry axis (r = const).",
     )
@@ -184,6 +217,17 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         type=Path,
         help="Optional output image path. If omitted, saves to plots/axis_slice_r<radius>.png.",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to parse uncached VTU files (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every VTU file instead of reusing arrays cached in <data-dir>/.cache",
+    )
     parser.add_argument(
         "--show",
         action="store_true",
@@ -195,7 +239,11 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=300,
         help="Figure DPI when saving (default: %(default)s)",
     )
-    return parser.parse_args(argv)
+    return parser
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
 
 # ---------------------------------------------------------------------------
@@ -203,19 +251,13 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
 # ---------------------------------------------------------------------------
 
 
-def select_cases(data_dir: Path, requested: Sequence[int] | None) -> List[CaseData]:
-    vtus = sorted(data_dir.glob("plasma_500W(*).vtu"), key=lambda p: _extract_index(p.name))
-    if not vtus:
-        raise FileNotFoundError(f"no VTU files found in {data_dir}")
-    cases = [load_case(vtu) for vtu in vtus]
-    if not requested:
-        return cases
-    requested_set = set(requested)
-    filtered = [case for case in cases if case.index in requested_set]
-    missing = requested_set - {case.index for case in filtered}
-    if missing:
-        raise ValueError(f"cases not found: {sorted(missing)}")
-    return filtered
+def select_cases(
+    data_dir: Path,
+    requested: Sequence[int] | None,
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[CaseData]:
+    return load_cases(case_paths(data_dir, requested), cache_dir, jobs)
 
 
 def build_figure(results: Iterable[AxisSlice], *, dpi: int, show_mode: bool, radius: float) -> plt.Figure:
@@ -224,7 +266,7 @@ def build_figure(results: Iterable[AxisSlice], *, dpi: int, show_mode: bool, rad
 
     apply_common_style()
     fig_dpi = min(dpi, 180) if show_mode else dpi
-    fig, ax, _ = create_figure(dpi=fig_dpi)
+    fig, ax, _ = create_figure(dpi=fig_dpi, headless=not show_mode)
     width, height = fig.get_size_inches()
     fig.set_size_inches(width * 1.25, height, forward=True)
     style_axes(ax, axis_style=SUMMARY_AXES_STYLE)
@@ -240,9 +282,16 @@ def build_figure(results: Iterable[AxisSlice], *, dpi: int, show_mode: bool, rad
     norm = LogNorm(vmin=radii.min(), vmax=radii.max())
     cmap = colormaps["viridis"]
 
-    for res in results:
-        color = cmap(norm(res.radius))
-        ax.plot(res.h, res.density, color=color, linewidth=1.6)
+    # One collection artist for all cases instead of one Line2D per curve.
+    curves = LineCollection(
+        [np.column_stack((res.h, res.density)) for res in results],
+        colors=cmap(norm(radii)),
+        linewidths=1.6,
+        capstyle=mpl.rcParams["lines.solid_capstyle"],
+        joinstyle=mpl.rcParams["lines.solid_joinstyle"],
+    )
+    ax.add_collection(curves)
+    ax.autoscale_view()
 
     ax.set_xlabel("Height h")
     ax.set_ylabel(r"Electron density (1/m$^{3}$)")
@@ -265,9 +314,10 @@ def build_figure(results: Iterable[AxisSlice], *, dpi: int, show_mode: bool, rad
 
 
 def main(argv: Sequence[str] | None = None) -> int:
-    args = parse_args(argv or sys.argv[1:])
+    args = parse_args(sys.argv[1:] if argv is None else argv)
     data_dir = args.data_dir.resolve()
-    cases = select_cases(data_dir, args.cases)
+    cache_dir = None if args.no_cache else data_dir / ".cache"
+    cases = select_cases(data_dir, args.cases, cache_dir, args.jobs)
 
     results: List[AxisSlice] = []
     print(f"Sampling along r = {args.radius:.6f}")
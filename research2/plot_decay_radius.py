@@ -4,9 +4,13 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -31,7 +35,7 @@ except ImportError:  # pragma: no cover
         style_axes,
     )
 
-from plot_radial_slice import CaseData, SliceResult, select_cases, sample_slice  # type: ignore
+from plot_radial_slice import SliceResult, case_paths, load_case, sample_slice  # type: ignore
 
 
 # ---------------------------------------------------------------------------
@@ -39,7 +43,8 @@ from plot_radial_slice import CaseData, SliceResult, select_cases, sample_slice
 # ---------------------------------------------------------------------------
 
 
-def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Compute the radius where density decays to alpha * peak and plot against cavity size.",
     )
@@ -90,7 +95,22 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=300,
         help="Figure DPI when saving (default: %(default)s)",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to load and slice cases (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every VTU file instead of reusing arrays cached in <data-dir>/.cache",
+    )
+    return parser
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
 
 # ---------------------------------------------------------------------------
@@ -108,49 +128,113 @@ def validate_alpha(values: Sequence[float]) -> List[float]:
 
 
 def compute_decay_radius(slice_data: SliceResult, alpha: float) -> float | None:
+    radius = float(compute_decay_radii(slice_data, [alpha])[0])
+    return None if np.isnan(radius) else radius
+
+
+def compute_decay_radii(slice_data: SliceResult, alphas: Sequence[float]) -> np.ndarray:
+    """Radius past the peak where density first drops to ``alpha * peak``, per alpha.
+
+    Entries are NaN where the density never falls that low.
+    """
+    alphas = np.asarray(alphas, dtype=float)
     densities = slice_data.density
     radii = slice_data.r
     if densities.size == 0:
-        return None
+        return np.full(alphas.shape, np.nan)
 
     peak_idx = int(np.argmax(densities))
     peak_value = float(densities[peak_idx])
-    threshold = alpha * peak_value
+    thresholds = alphas * peak_value
 
     tail_dens = densities[peak_idx:]
     tail_r = radii[peak_idx:]
 
-    below = np.nonzero(tail_dens <= threshold)[0]
-    if below.size == 0:
-        return None
-    j = below[0]
-    if j == 0:
-        return float(tail_r[0])
-
-    r0, r1 = tail_r[j - 1], tail_r[j]
-    d0, d1 = tail_dens[j - 1], tail_dens[j]
-    if d0 == d1:
-        return float(r1)
-    t = (threshold - d0) / (d1 - d0)
-    r_interp = r0 + t * (r1 - r0)
-    return float(r_interp)
-
-def build_plot(points_by_alpha: Dict[float, List[Tuple[float, float]]], *, dpi: int, show_mode: bool, alpha_label: bool = True) -> plt.Figure:
+    # The running minimum first reaches a threshold at the same index the tail does, and
+    # it is non-increasing, so every alpha's crossing comes from one binary search.
+    running_min = np.minimum.accumulate(tail_dens)
+    j = np.searchsorted(-running_min, -thresholds, side="left")
+    found = j < tail_dens.size
+
+    result = np.full(alphas.shape, np.nan)
+    at_peak = found & (j == 0)
+    result[at_peak] = tail_r[0]
+    inner = found & (j > 0)
+    j1 = j[inner]
+    r0, r1 = tail_r[j1 - 1], tail_r[j1]
+    d0, d1 = tail_dens[j1 - 1], tail_dens[j1]
+    flat = d0 == d1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (thresholds[inner] - d0) / (d1 - d0)
+    result[inner] = np.where(flat, r1, r0 + t * (r1 - r0))
+    return result
+
+
+@dataclass(frozen=True)
+class CaseDecay:
+    index: int
+    r_max: float
+    z_target: float
+    decay_radii: Optional[np.ndarray]  # one per alpha; None when the slice was unusable
+
+
+def process_case(
+    path: Path,
+    z_override: float | None,
+    samples: int,
+    alphas: Sequence[float],
+    cache_dir: Optional[Path] = None,
+) -> CaseDecay:
+    """Load one case, slice it at ``z_override`` (or its density peak) and get its decay radii."""
+    case = load_case(path, cache_dir)
+    z_target = case.z_peak if z_override is None else z_override
+    slice_data = sample_slice(case, z_target, samples=samples)
+    decay_radii = None if slice_data is None else compute_decay_radii(slice_data, alphas)
+    return CaseDecay(index=case.index, r_max=case.r_max, z_target=z_target, decay_radii=decay_radii)
+
+
+def _process_case_task(
+    task: Tuple[Path, Optional[float], int, Tuple[float, ...], Optional[Path]],
+) -> CaseDecay:
+    return process_case(*task)
+
+
+def process_cases(
+    paths: Sequence[Path],
+    z_override: float | None,
+    samples: int,
+    alphas: Sequence[float],
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[CaseDecay]:
+    """Run :func:`process_case` for every path in order, on up to ``jobs`` processes."""
+    # Workers return only small arrays; the triangulated meshes never cross processes.
+    tasks = [(path, z_override, samples, tuple(alphas), cache_dir) for path in paths]
+    workers = max(1, min(jobs, len(tasks)))
+    if workers == 1:
+        return list(map(_process_case_task, tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_process_case_task, tasks))
+
+
+def build_plot(points_by_alpha: Dict[float, np.ndarray], *, dpi: int, show_mode: bool, alpha_label: bool = True) -> plt.Figure:
+    """Plot one curve per alpha; each value is an ``(n, 2)`` array of (r_max, decay radius)."""
     apply_common_style()
     fig_dpi = min(dpi, 180) if show_mode else dpi
-    fig, ax, _ = create_figure(dpi=fig_dpi)
+    fig, ax, _ = create_figure(dpi=fig_dpi, headless=not show_mode)
     width, height = fig.get_size_inches()
     fig.set_size_inches(width * 1.25, height, forward=True)
     style_axes(ax, axis_style=SUMMARY_AXES_STYLE)
 
-    non_empty = {alpha: sorted(points, key=lambda item: item[0]) for alpha, points in points_by_alpha.items() if points}
+    non_empty = {
+        alpha: points[np.argsort(points[:, 0], kind="stable")]
+        for alpha, points in points_by_alpha.items()
+        if len(points)
+    }
     if not non_empty:
         raise ValueError("no valid decay radii to plot")
 
-    all_x = np.concatenate([np.array([p[0] for p in pts]) for pts in non_empty.values()])
-    all_y = np.concatenate([np.array([p[1] for p in pts]) for pts in non_empty.values()])
-
-    limit = max(all_x.max(), all_y.max()) * 1.05
+    limit = np.concatenate(list(non_empty.values())).max() * 1.05
     ax.plot([0, limit], [0, limit], ls="--", color="gray", lw=1.0)
 
     cmap = colormaps["viridis"]
@@ -158,11 +242,9 @@ def build_plot(points_by_alpha: Dict[float, List[Tuple[float, float]]], *, dpi:
 
     for color, alpha in zip(colors, sorted(non_empty), strict=True):
         pts = non_empty[alpha]
-        x = np.array([p[0] for p in pts])
-        y = np.array([p[1] for p in pts])
         ax.plot(
-            x,
-            y,
+            pts[:, 0],
+            pts[:, 1],
             marker="x",
             linestyle="-",
             linewidth=1.1,
@@ -197,44 +279,51 @@ def _format_alpha(alpha: float) -> str:
 
 
 def main(argv: Sequence[str] | None = None) -> int:
-    args = parse_args(argv or sys.argv[1:])
+    args = parse_args(sys.argv[1:] if argv is None else argv)
     alphas = validate_alpha(args.alpha)
 
     data_dir = args.data_dir.resolve()
-    cases = select_cases(data_dir, args.cases)
+    paths = case_paths(data_dir, args.cases)
 
     auto_mode = args.z is None
     if auto_mode:
         print("Auto-selecting z at peak electron density for each case:")
 
-    points_by_alpha: Dict[float, List[Tuple[float, float]]] = {alpha: [] for alpha in alphas}
+    # One row per plotted case: its cavity radius and the decay radius for every alpha.
+    case_radii: List[float] = []
+    decay_rows: List[np.ndarray] = []
 
-    for case in cases:
-        z_target = args.z
-        if z_target is None:
-            idx = int(np.argmax(case.density))
-            z_target = float(case.z[idx])
-            print(f"  Case {case.index}: z_peak = {z_target:.6f}")
-        slice_data = sample_slice(case, z_target, samples=args.samples)
-        if slice_data is None:
+    cache_dir = None if args.no_cache else data_dir / ".cache"
+    for case in process_cases(paths, args.z, args.samples, alphas, cache_dir, args.jobs):
+        if auto_mode:
+            print(f"  Case {case.index}: z_peak = {case.z_target:.6f}")
+        decay_radii = case.decay_radii
+        if decay_radii is None:
             print(
-                f"⚠️  Case {case.index} skipped (z={z_target:.3f} outside domain or insufficient data)",
+                f"⚠️  Case {case.index} skipped (z={case.z_target:.3f} outside domain or insufficient data)",
                 file=sys.stderr,
             )
             continue
         print(f"  Case {case.index}: cavity r_max = {case.r_max:.3f}")
-        for alpha in alphas:
-            decay_r = compute_decay_radius(slice_data, alpha)
-            if decay_r is None:
+        for alpha, decay_r in zip(alphas, decay_radii):
+            if np.isnan(decay_r):
                 print(
                     f"    ⚠️ alpha={alpha:.2f}: density never fell below {alpha:.2f}×peak",
                     file=sys.stderr,
                 )
                 continue
-            points_by_alpha[alpha].append((case.r_max, decay_r))
             print(f"    alpha={alpha:.2f}: decay radius = {decay_r:.3f}")
-
-    non_empty = {alpha: pts for alpha, pts in points_by_alpha.items() if pts}
+        case_radii.append(case.r_max)
+        decay_rows.append(decay_radii)
+
+    non_empty: Dict[float, np.ndarray] = {}
+    if decay_rows:
+        decay_table = np.vstack(decay_rows)
+        r_max = np.asarray(case_radii, dtype=float)
+        for column, alpha in enumerate(alphas):
+            found = ~np.isnan(decay_table[:, column])
+            if found.any():
+                non_empty[alpha] = np.column_stack((r_max[found], decay_table[found, column]))
     if not non_empty:
         raise SystemExit("no decay radii computed — adjust alpha set or selected cases")
 
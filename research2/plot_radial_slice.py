@@ -4,16 +4,27 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import meshio
 import numpy as np
+import matplotlib as mpl
 from matplotlib import colormaps
 import matplotlib.pyplot as plt
-from matplotlib.tri import LinearTriInterpolator, Triangulation
+from matplotlib.tri import Triangulation
+
+try:  # pragma: no cover - optional dependency
+    from vtkmodules.util.numpy_support import vtk_to_numpy
+    from vtkmodules.vtkCommonDataModel import VTK_TRIANGLE
+    from vtkmodules.vtkIOXML import vtkXMLUnstructuredGridReader
+except ImportError:  # pragma: no cover
+    vtkXMLUnstructuredGridReader = None
 
 # ---------------------------------------------------------------------------
 # Optional import of shared plotting style (falls back if unavailable).
@@ -38,6 +49,9 @@ except ImportError:  # pragma: no cover - executed when run from research2/
         style_axes,
     )
 
+# Shared with research1, found through the same path as plot_style.
+from disk_cache import entry_path, store_entry  # type: ignore  # noqa: E402
+
 
 @dataclass(frozen=True)
 class CaseData:
@@ -51,6 +65,17 @@ class CaseData:
     z_min: float
     z_max: float
     radius: float  # cavity radius
+    z_peak: float  # z of the density maximum
+
+    def z_peaks(self, k: int) -> np.ndarray:
+        """z of the ``k`` highest-density points, highest first, from a partial sort."""
+        k = max(0, min(k, self.density.size))
+        if k == 0:
+            return np.empty(0, dtype=self.z.dtype)
+        # Index order before the stable sort, so ties rank like np.argmax picks.
+        top = np.sort(np.argpartition(self.density, -k)[-k:])
+        top = top[np.argsort(-self.density[top], kind="stable")]
+        return self.z[top]
 
 
 @dataclass(frozen=True)
@@ -67,6 +92,9 @@ class SliceResult:
 # Data loading utilities
 # ---------------------------------------------------------------------------
 
+# r, z, density and triangle arrays of one case, as cached and sent between processes.
+_MeshArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
 
 def _find_triangles(mesh: meshio.Mesh) -> np.ndarray:
     for block in mesh.cells:
@@ -75,30 +103,139 @@ def _find_triangles(mesh: meshio.Mesh) -> np.ndarray:
     raise ValueError("mesh does not contain triangle cells")
 
 
-def load_case(path: Path) -> CaseData:
+def _read_mesh_arrays(path: Path) -> _MeshArrays:
+    if vtkXMLUnstructuredGridReader is not None:
+        return _read_mesh_arrays_vtk(path)
     mesh = meshio.read(path)
     points = mesh.points
-    r = points[:, 0]
-    z = points[:, 1]
     density = mesh.point_data.get("Electron_density")
     if density is None:
         raise KeyError(f"Electron_density field missing in {path.name}")
-    triangles = _find_triangles(mesh)
-    triangulation = Triangulation(r, z, triangles)
+    triangles = _find_triangles(mesh).astype(np.int32)
+    return points[:, 0], points[:, 1], density, triangles
+
+
+def _read_mesh_arrays_vtk(path: Path) -> _MeshArrays:
+    """Same arrays as the meshio path, decoded by VTK's C++ reader; only the density is parsed."""
+    reader = vtkXMLUnstructuredGridReader()
+    reader.SetFileName(str(path))
+    reader.UpdateInformation()
+    selection = reader.GetPointDataArraySelection()
+    selection.DisableAllArrays()
+    selection.EnableArray("Electron_density")
+    reader.GetCellDataArraySelection().DisableAllArrays()
+    reader.Update()
+    grid = reader.GetOutput()
+
+    density_array = grid.GetPointData().GetArray("Electron_density")
+    if density_array is None:
+        raise KeyError(f"Electron_density field missing in {path.name}")
+    # These two are returned to the caller, so copy them; the cell arrays below are
+    # only indexed while the grid is alive.
+    points = np.array(vtk_to_numpy(grid.GetPoints().GetData()))
+    density = np.array(vtk_to_numpy(density_array))
+
+    cells = grid.GetCells()
+    connectivity = vtk_to_numpy(cells.GetConnectivityArray())
+    offsets = vtk_to_numpy(cells.GetOffsetsArray())[:-1]
+    is_triangle = vtk_to_numpy(grid.GetCellTypesArray()) == VTK_TRIANGLE
+    if not is_triangle.any():
+        raise ValueError("mesh does not contain triangle cells")
+    starts = offsets[is_triangle]
+    triangles = connectivity[starts[:, None] + np.arange(3)].astype(np.int32)
+    return points[:, 0], points[:, 1], density, triangles
+
+
+_MESH_SUFFIX = ".mesh.npz"
+
+
+def _cache_path(path: Path, cache_dir: Optional[Path]) -> Optional[Path]:
+    return None if cache_dir is None else entry_path(cache_dir, path, _MESH_SUFFIX)
+
+
+def _load_arrays(path: Path, cache_dir: Optional[Path] = None) -> _MeshArrays:
+    """Mesh arrays of one case, reusing ``cache_dir`` while the VTU is unchanged."""
+    cache_path = _cache_path(path, cache_dir)
+    if cache_path is not None and cache_path.exists():
+        with np.load(cache_path) as cached:
+            return tuple(cached[name] for name in ("r", "z", "density", "triangles"))
+
+    r, z, density, triangles = _read_mesh_arrays(path)
+    if cache_dir is not None:
+        store_entry(
+            cache_dir,
+            path,
+            _MESH_SUFFIX,
+            lambda tmp_path: np.savez(tmp_path, r=r, z=z, density=density, triangles=triangles),
+        )
+    return r, z, density, triangles
+
+
+def _load_arrays_task(task: Tuple[Path, Optional[Path]]) -> _MeshArrays:
+    return _load_arrays(*task)
+
+
+def _case_from_arrays(path: Path, arrays: _MeshArrays) -> CaseData:
+    # The Triangulation is built here rather than in a worker, since it is not picklable.
+    r, z, density, triangles = arrays
+    r_max = float(r.max())
     return CaseData(
         index=_extract_index(path.name),
         path=path,
         r=r,
         z=z,
         density=density,
-        triangulation=triangulation,
-        r_max=float(r.max()),
+        triangulation=Triangulation(r, z, triangles),
+        r_max=r_max,
         z_min=float(z.min()),
         z_max=float(z.max()),
-        radius=float(r.max()),  # cavity radius is r_max
+        radius=r_max,  # cavity radius is r_max
+        z_peak=float(z[int(np.argmax(density))]),
     )
 
 
+def load_case(path: Path, cache_dir: Optional[Path] = None) -> CaseData:
+    """Load one case, reusing arrays cached in ``cache_dir`` while the VTU is unchanged."""
+    return _case_from_arrays(path, _load_arrays(path, cache_dir))
+
+
+def _load_mesh_arrays(
+    paths: Sequence[Path],
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[_MeshArrays]:
+    """Mesh arrays per path in order, parsing the uncached VTUs on up to ``jobs`` processes."""
+    arrays: dict[Path, _MeshArrays] = {}
+    pending: List[Path] = []
+    for path in paths:
+        cache_path = _cache_path(path, cache_dir)
+        if cache_path is not None and cache_path.exists():
+            arrays[path] = _load_arrays(path, cache_dir)
+        else:
+            pending.append(path)
+
+    workers = max(1, min(jobs, len(pending)))
+    tasks = [(path, cache_dir) for path in pending]
+    if workers == 1:
+        arrays.update(zip(pending, map(_load_arrays_task, tasks)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            arrays.update(zip(pending, executor.map(_load_arrays_task, tasks)))
+    return [arrays[path] for path in paths]
+
+
+def load_cases(
+    paths: Sequence[Path],
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[CaseData]:
+    """Load cases in order, parsing the uncached VTUs on up to ``jobs`` processes."""
+    return [
+        _case_from_arrays(path, arrays)
+        for path, arrays in zip(paths, _load_mesh_arrays(paths, cache_dir, jobs))
+    ]
+
+
 def _extract_index(name: str) -> int:
     start = name.find("(")
     end = name.find(")", start + 1)
@@ -112,18 +249,81 @@ def _extract_index(name: str) -> int:
 # ---------------------------------------------------------------------------
 
 
+def line_triangles(
+    triangulation: Triangulation,
+    level: float,
+    query: np.ndarray,
+    *,
+    axis: str = "z",
+) -> np.ndarray:
+    """Index of a triangle containing each query point on a coordinate line, or -1 outside.
+
+    ``axis="z"`` queries the points ``(query, level)`` on the line ``z = level``, and
+    ``axis="r"`` the points ``(level, query)`` on ``r = level``. Every triangle the line
+    cuts covers one interval of it, so the lookup is a sort of those intervals plus a
+    binary search per point, which replaces building a trapezoid-map TriFinder.
+    """
+    if axis == "z":
+        along, across = triangulation.x, triangulation.y
+    elif axis == "r":
+        along, across = triangulation.y, triangulation.x
+    else:
+        raise ValueError(f"axis must be 'r' or 'z', got {axis!r}")
+
+    # Classify the vertices against the line once (1 below, 2 above, 3 on it); a triangle
+    # is cut unless all three of its vertices fall on the same side.
+    side = np.where(across < level, 1, np.where(across > level, 2, 3)).astype(np.uint8)
+    tri_side = side[triangulation.triangles]
+    tri_side = tri_side[:, 0] | tri_side[:, 1] | tri_side[:, 2]
+    crossing = (tri_side != 1) & (tri_side != 2)
+    if triangulation.mask is not None:
+        crossing &= ~triangulation.mask
+    candidates = np.flatnonzero(crossing)
+    found = np.full(query.shape, -1, dtype=np.int64)
+    if candidates.size == 0:
+        return found
+
+    # The cut spans the vertices lying on the line and the edges crossing it strictly.
+    tri_across = across[triangulation.triangles[candidates]]
+    tri_along = along[triangulation.triangles[candidates]]
+    next_along = np.roll(tri_along, -1, axis=1)
+    next_across = np.roll(tri_across, -1, axis=1)
+    strict = (tri_across - level) * (next_across - level) < 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge_along = tri_along + (level - tri_across) * (next_along - tri_along) / (next_across - tri_across)
+    points = np.concatenate((tri_along, edge_along), axis=1)
+    on_cut = np.concatenate((tri_across == level, strict), axis=1)
+    lo = np.where(on_cut, points, np.inf).min(axis=1)
+    hi = np.where(on_cut, points, -np.inf).max(axis=1)
+
+    order = np.argsort(lo, kind="stable")
+    lo, hi, candidates = lo[order], hi[order], candidates[order]
+    # For the intervals starting at or before a point, the one reaching furthest
+    # contains the point whenever any of them does.
+    reach = np.maximum.accumulate(hi)
+    owner = np.maximum.accumulate(np.where(hi >= reach, np.arange(hi.size), 0))
+    slot = np.searchsorted(lo, query, side="right") - 1
+    inside = slot >= 0
+    inside[inside] = query[inside] <= reach[slot[inside]]
+    found[inside] = candidates[owner[slot[inside]]]
+    return found
+
+
 def sample_slice(case: CaseData, z_target: float, *, samples: int) -> SliceResult | None:
     if not case.z_min <= z_target <= case.z_max:
         return None
-    interpolator = LinearTriInterpolator(case.triangulation, case.density)
     r_line = np.linspace(0.0, case.r_max, samples)
-    z_line = np.full_like(r_line, z_target)
-    values = interpolator(r_line, z_line)
-    if isinstance(values, np.ma.MaskedArray):
-        mask = ~values.mask
-        r_line = r_line[mask]
-        values = values.data[mask]
-    values = np.asarray(values)
+    tri_index = line_triangles(case.triangulation, z_target, r_line)
+    inside = tri_index >= 0
+    if not inside.any():
+        return None  # the line runs through a hole or notch in the mesh
+    r_line = r_line[inside]
+    # Same plane evaluation as LinearTriInterpolator, with the coefficients computed for
+    # the located triangles only rather than the whole mesh.
+    located, slot = np.unique(tri_index[inside], return_inverse=True)
+    band = Triangulation(case.r, case.z, case.triangulation.triangles[located])
+    coeffs = band.calculate_plane_coefficients(case.density)[slot]
+    values = coeffs[:, 0] * r_line + coeffs[:, 1] * z_target + coeffs[:, 2]
     finite = np.isfinite(values)
     r_line = r_line[finite]
     values = values[finite]
@@ -132,12 +332,42 @@ def sample_slice(case: CaseData, z_target: float, *, samples: int) -> SliceResul
     return SliceResult(index=case.index, z_peak=z_target, r=r_line, density=values, r_max=case.r_max, radius=case.radius)
 
 
+def _slice_case_task(
+    task: Tuple[Path, Optional[float], int, Optional[Path]],
+) -> Tuple[int, float, SliceResult | None]:
+    path, z_override, samples, cache_dir = task
+    case = load_case(path, cache_dir)
+    z_target = case.z_peak if z_override is None else z_override
+    return case.index, z_target, sample_slice(case, z_target, samples=samples)
+
+
+def slice_cases(
+    paths: Sequence[Path],
+    z_override: float | None,
+    samples: int,
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> Iterator[Tuple[int, float, SliceResult | None]]:
+    """Yield ``(index, z, slice)`` per path in order, loading and slicing on up to ``jobs`` processes.
+
+    Each mesh is dropped once its slice is taken, so only the small slice arrays pile up.
+    """
+    tasks = [(path, z_override, samples, cache_dir) for path in paths]
+    workers = max(1, min(jobs, len(tasks)))
+    if workers == 1:
+        yield from map(_slice_case_task, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_slice_case_task, tasks)
+
+
 # ---------------------------------------------------------------------------
 # CLI helpers
 # ---------------------------------------------------------------------------
 
 
-def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Plot electron-density vs radius for VTU cavities at a fixed axial position.",
     )
@@ -181,7 +411,22 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=300,
         help="Figure DPI when saving (default: %(default)s)",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to load and slice cases (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every VTU file instead of reusing arrays cached in <data-dir>/.cache",
+    )
+    return parser
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
 
 
 # ---------------------------------------------------------------------------
@@ -189,28 +434,42 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
 # ---------------------------------------------------------------------------
 
 
-def select_cases(data_dir: Path, requested: Sequence[int] | None) -> List[CaseData]:
-    vtus = sorted(data_dir.glob("plasma_500W(*).vtu"), key=lambda p: _extract_index(p.name))
-    if not vtus:
+def case_paths(data_dir: Path, requested: Sequence[int] | None) -> List[Path]:
+    """VTU files of the requested cases (all when ``requested`` is empty), by index."""
+    indexed = sorted(
+        ((_extract_index(vtu.name), vtu) for vtu in data_dir.glob("plasma_500W(*).vtu")),
+        key=lambda item: item[0],
+    )
+    if not indexed:
         raise FileNotFoundError(f"no VTU files found in {data_dir}")
-    cases = [load_case(vtu) for vtu in vtus]
     if not requested:
-        return cases
+        return [vtu for _, vtu in indexed]
+    # Filter on the file-name index so unrequested cases are never parsed.
     requested_set = set(requested)
-    filtered = [case for case in cases if case.index in requested_set]
-    missing = requested_set - {case.index for case in filtered}
+    filtered = [(index, vtu) for index, vtu in indexed if index in requested_set]
+    missing = requested_set - {index for index, _ in filtered}
     if missing:
         raise ValueError(f"cases not found: {sorted(missing)}")
-    return filtered
+    return [vtu for _, vtu in filtered]
+
+
+def select_cases(
+    data_dir: Path,
+    requested: Sequence[int] | None,
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+) -> List[CaseData]:
+    return load_cases(case_paths(data_dir, requested), cache_dir, jobs)
 
 
 def build_figure(results: Iterable[SliceResult], *, dpi: int, show_mode: bool, global_z: float | None) -> plt.Figure:
     from matplotlib.colors import LogNorm
     from matplotlib.cm import ScalarMappable
+    from matplotlib.collections import LineCollection
 
     apply_common_style()
     fig_dpi = min(dpi, 180) if show_mode else dpi
-    fig, ax, _ = create_figure(dpi=fig_dpi)
+    fig, ax, _ = create_figure(dpi=fig_dpi, headless=not show_mode)
     # widen the canvas to keep axes readable even with colorbar
     width, height = fig.get_size_inches()
     fig.set_size_inches(width * 1.25, height, forward=True)
@@ -228,9 +487,18 @@ def build_figure(results: Iterable[SliceResult], *, dpi: int, show_mode: bool, g
     norm = LogNorm(vmin=radii.min(), vmax=radii.max())
     cmap = colormaps["viridis"]
 
-    for res in results:
-        color = cmap(norm(res.radius))
-        ax.plot(res.r, res.density, color=color, linewidth=1.6)
+    # One collection for all curves instead of a Line2D artist per case; the cap/join
+    # styles and z-order match what ax.plot would give.
+    curves = LineCollection(
+        [np.column_stack((res.r, res.density)) for res in results],
+        colors=cmap(norm(radii)),
+        linewidths=1.6,
+        capstyle=mpl.rcParams["lines.solid_capstyle"],
+        joinstyle=mpl.rcParams["lines.solid_joinstyle"],
+        zorder=2,
+    )
+    ax.add_collection(curves)
+    ax.autoscale_view()
 
     ax.set_xlabel("Radius r")
     ax.set_ylabel(r"Electron density (1/m$^{3}$)")
@@ -257,30 +525,32 @@ def build_figure(results: Iterable[SliceResult], *, dpi: int, show_mode: bool, g
 
 
 def main(argv: Sequence[str] | None = None) -> int:
-    args = parse_args(argv or sys.argv[1:])
+    args = parse_args(sys.argv[1:] if argv is None else argv)
     data_dir = args.data_dir.resolve()
-    cases = select_cases(data_dir, args.cases)
+    cache_dir = None if args.no_cache else data_dir / ".cache"
+    paths = case_paths(data_dir, args.cases)
 
     results: List[SliceResult] = []
     auto_mode = args.z is None
+    # The per-case report is collected and written once per stream after the loop.
+    log_lines: List[str] = []
+    skipped_lines: List[str] = []
     if auto_mode:
-        print("Auto-selecting z at peak electron density for each case:")
-
-    for case in cases:
-        z_target = args.z
-        if z_target is None:
-            idx = int(np.argmax(case.density))
-            z_target = float(case.z[idx])
-            print(f"  Case {case.index}: z_peak = {z_target:.6f}")
-        sampled = sample_slice(case, z_target, samples=args.samples)
+        log_lines.append("Auto-selecting z at peak electron density for each case:")
+
+    for index, z_target, sampled in slice_cases(paths, args.z, args.samples, cache_dir, args.jobs):
+        if auto_mode:
+            log_lines.append(f"  Case {index}: z_peak = {z_target:.6f}")
         if sampled is None:
-            print(
-                f"⚠️  Case {case.index} skipped (z={z_target:.3f} outside domain or insufficient data)",
-                file=sys.stderr,
-            )
+            skipped_lines.append(f"⚠️  Case {index} skipped (z={z_target:.3f} outside domain or insufficient data)")
             continue
         results.append(sampled)
 
+    if log_lines:
+        sys.stdout.write("\n".join(log_lines) + "\n")
+    if skipped_lines:
+        sys.stderr.write("\n".join(skipped_lines) + "\n")
+
     if not results:
         raise SystemExit("no cases produced radial data — check z range or selected cases")
 
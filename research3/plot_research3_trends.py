@@ -3,13 +3,22 @@
 
 from __future__ import annotations
 
+import argparse
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib as mpl
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow.csv as pacsv
+except ImportError:  # pragma: no cover
+    pacsv = None
 
 CSV_PATH = Path("research3 - 工作表1.csv")
 OUTPUT_LOGLOG = Path("research3_loglog.png")
@@ -25,14 +34,35 @@ mpl.rcParams.update({
 })
 
 
+@lru_cache(maxsize=None)
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Plot cutoff power vs radius (log-log) and report the low-radius fit.",
+    )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=300,
+        help="Figure DPI when saving; lower it for quick previews (default: %(default)s)",
+    )
+    return parser
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    return _make_parser().parse_args(argv)
+
+
 def load_data() -> pd.DataFrame:
-    df = pd.read_csv(CSV_PATH)
+    if pacsv is not None:
+        df = pacsv.read_csv(CSV_PATH).to_pandas()
+    else:
+        df = pd.read_csv(CSV_PATH)
     df = df.rename(columns={df.columns[0]: "r", df.columns[1]: "p"})
     df = df.sort_values("r")
     return df
 
 
-def style_axis(ax: plt.Axes) -> None:
+def style_axis(ax: Axes) -> None:
     ax.tick_params(direction="in", length=6, width=1.4)
     ax.minorticks_on()
     ax.tick_params(which="minor", direction="in", length=3, width=1.0)
@@ -41,8 +71,23 @@ def style_axis(ax: plt.Axes) -> None:
     ax.grid(True, linestyle="--", linewidth=0.7, alpha=0.3)
 
 
-def plot_loglog(df: pd.DataFrame) -> Dict[str, float]:
-    fig, ax = plt.subplots(figsize=(6.5, 4.5), dpi=300)
+def fit_line(x: np.ndarray, y: np.ndarray) -> Tuple[float, float, float]:
+    """Least-squares ``(slope, intercept, corr)`` of ``y`` on ``x`` from centred sums."""
+    dx = x - x.mean()
+    dy = y - y.mean()
+    sxx = np.dot(dx, dx)
+    sxy = np.dot(dx, dy)
+    slope = float(sxy / sxx)
+    intercept = float(y.mean() - slope * x.mean())
+    corr = float(sxy / np.sqrt(sxx * np.dot(dy, dy)))
+    return slope, intercept, corr
+
+
+def plot_loglog(df: pd.DataFrame, dpi: int = 300) -> Dict[str, float]:
+    # File output only: a local Agg canvas, leaving pyplot's backend untouched.
+    fig = Figure(figsize=(6.5, 4.5), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
     ax.loglog(df["r"], df["p"], color="#c0392b", marker="o", linewidth=2, markersize=5, label="Data")
 
     subset = df[df["r"] < 36]
@@ -51,11 +96,12 @@ def plot_loglog(df: pd.DataFrame) -> Dict[str, float]:
     if len(subset) >= 2:
         log_r = np.log10(subset["r"].to_numpy())
         log_p = np.log10(subset["p"].to_numpy())
-        slope, intercept = np.polyfit(log_r, log_p, deg=1)
-        corr = float(np.corrcoef(log_r, log_p)[0, 1])
+        slope, intercept, corr = fit_line(log_r, log_p)
 
-        fit_r = np.logspace(np.log10(subset["r"].min()), np.log10(subset["r"].max()), 200)
-        fit_p = 10 ** (intercept + slope * np.log10(fit_r))
+        # A power law is straight on log-log axes, so the endpoints define the whole line.
+        # log10 is monotone, so the extremes of log_r are the logs of the radius extremes.
+        fit_r = np.array([subset["r"].min(), subset["r"].max()], dtype=float)
+        fit_p = 10 ** (intercept + slope * np.array([log_r.min(), log_r.max()]))
         ax.loglog(fit_r, fit_p, color="#1f618d", linestyle="--", linewidth=2, label="Fit (r < 36 mm)")
         ax.loglog(subset["r"], subset["p"], linestyle="None", marker="o", markersize=6,
                   markerfacecolor="#1f618d", markeredgecolor="#1f618d", alpha=0.85)
@@ -87,13 +133,13 @@ def plot_loglog(df: pd.DataFrame) -> Dict[str, float]:
     style_axis(ax)
     fig.tight_layout()
     fig.savefig(OUTPUT_LOGLOG)
-    plt.close(fig)
     return stats
 
 
-def main() -> None:
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
     df = load_data()
-    stats = plot_loglog(df)
+    stats = plot_loglog(df, dpi=args.dpi)
     print(f"Saved {OUTPUT_LOGLOG}")
 
     if stats.get("count", 0) >= 2 and "corr" in stats:
@@ -39,7 +39,7 @@ echo -e "${GREEN}🚀 啟動統一 CLI...${NC}"
 echo ""
 
 # 執行 CLI
-python cli.py
+python cli.py "$@"
 
 # 退出時提示
 echo ""